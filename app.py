@@ -1,7 +1,14 @@
 import streamlit as st
-import requests, json, re
+import numpy as np
+import requests, json, re, threading, sqlite3, hashlib, time, os, sys, types, socket, fcntl, logging, zlib, functools, importlib.util, email.utils
+import contextlib, collections, inspect, heapq, itertools
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from dateutil import parser as dtparse
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.scriptrunner.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
 
 # =========================
 # App config
@@ -10,8 +17,23 @@ st.set_page_config(page_title="News Agent — Personalized & Actionable", page_i
 IST = timezone(timedelta(hours=5, minutes=30))
 
 # Secrets (Streamlit Cloud → App ▸ Settings ▸ Secrets)
-NEWSAPI_KEY = st.secrets["NEWSAPI_KEY"]
-OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
+# probed once: with no secrets.toml, every `in st.secrets` would draw a "No secrets files found" error box
+HAS_SECRETS = st.secrets.load_if_toml_exists()
+
+def secret(name: str, default=None):
+    """st.secrets value, else the environment variable, else default (a missing secrets.toml is fine)."""
+    if HAS_SECRETS and name in st.secrets: return st.secrets[name]
+    value = os.environ.get(name)
+    if value is None: return default
+    if isinstance(default, bool): return value.strip().lower() in ("1", "true", "yes", "on")
+    return value
+
+NEWSAPI_KEY = secret("NEWSAPI_KEY", "")
+OPENAI_API_KEY = secret("OPENAI_API_KEY", "")
+# Upstream base URLs; point them at standin.py to run the whole pipeline against a local fake
+NEWSAPI_BASE = secret("NEWSAPI_BASE", "https://newsapi.org/v2").rstrip("/")
+OPENAI_BASE = secret("OPENAI_BASE", "https://api.openai.com/v1").rstrip("/")
+RSS_BASE = secret("RSS_BASE", "").rstrip("/")  # set → feeds are fetched as {RSS_BASE}/rss?u=<feed url>
 
 # =========================
 # Utilities & constants
@@ -65,6 +87,10 @@ CATEGORY_QUERIES = {
     "global": "world OR geopolitics OR ceasefire OR climate OR war OR summit OR sanctions OR trade deal"
 }
 
+TOP_CATEGORIES = {  # NewsAPI top-headlines categories pulled per tab
+    "tech": ["technology"], "health": ["health"], "finance": ["business"], "economy": ["business", "general"],
+}
+
 INDIA_RSS = [
     "https://www.thehindu.com/feeder/default.rss",
     "https://indianexpress.com/section/india/feed/",
@@ -76,76 +102,705 @@ INDIA_RSS = [
     "https://timesofindia.indiatimes.com/rss.cms"
 ]
 
-def as_ist(iso):
+# Keyword groups scanned against article text (title + desc + source) and the user's role
+HINT_KEYWORDS = {
+    "employment": ["employment","jobs","hiring","unemployment","payroll","labour","labor"],
+    "rates": ["inflation","cpi","wpi","prices","rbi","repo","rate hike","policy rate"],
+    "policy": ["election","regulation","regulatory","bill","parliament","supreme court"],
+    "platform": ["instagram","meta","youtube","tiktok","ads policy","brand safety","content moderation"],
+    "weather": ["heatwave","flood","monsoon","climate","rainfall","el niño","la niña"],
+    "food_safety": ["fssai","food safety","hygiene","contamination","recall"],
+}
+ROLE_KEYWORDS = {
+    "student": ["student","mba","law","bba","llb"],
+    "product": ["product","analyst","manager","strategy"],
+    "marketing": ["marketing","social","brand"],
+    "finance": ["finance","invest","bank","fintech"],
+    "founder": ["founder","startup"],
+    "mobility": ["mobility","road","safety","automotive","helmet","abs"],
+}
+
+class KeywordMatcher:
+    """Every keyword of every group compiled into one trie-shaped regex; scan() reports all groups hit in a
+    single pass, with the same result as `any(k in text for k in group)` per group on lowercased text."""
+    def __init__(self, groups: dict):
+        owners = {}
+        for g, words in groups.items():
+            for w in words:
+                if w: owners.setdefault(w.lower(), set()).add(g)
+        # the regex reports the longest keyword at each position; keywords that are its prefixes hit too
+        self._hits = {w: frozenset().union(*(owners[p] for p in owners if w.startswith(p))) for w in owners}
+        trie = {}
+        for w in owners:
+            node = trie
+            for ch in w: node = node.setdefault(ch, {})
+            node[""] = {}
+        self._re = re.compile(self._emit(trie)) if owners else None
+
+    @classmethod
+    def _emit(cls, node):
+        alts = [re.escape(ch) + cls._emit(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts: return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    def scan(self, text: str) -> frozenset:
+        if self._re is None: return frozenset()
+        hits, pos = set(), 0
+        while m := self._re.search(text, pos):  # restart one char in, so overlapping keywords are seen too
+            hits |= self._hits[m.group()]
+            pos = m.start() + 1
+        return frozenset(hits)
+
+    def any(self, text: str) -> bool:
+        return self._re is not None and self._re.search(text) is not None
+
+# Streamlit re-executes this module on every rerun, so its globals (plain lru_caches, pools, connections) would
+# be rebuilt each time; st.cache_resource only reads or writes inside a script run, so it misses on every call
+# from the ingester, fan-out/SWR workers and `python app.py`. Process-wide objects live in this registry instead,
+# which survives reruns because it is not part of this module.
+_PROCESS = sys.modules.setdefault("newsagent_process", types.ModuleType("newsagent_process"))
+_PROCESS.__dict__.setdefault("lock", threading.RLock())
+_PROCESS.__dict__.setdefault("resources", {})
+
+def process_resource(fn):
+    """Like st.cache_resource: one value per (function, args) for the whole process, in or out of a script run."""
+    @functools.wraps(fn)
+    def wrapper(*args):
+        key = (fn.__qualname__, args)
+        try: return _PROCESS.resources[key]
+        except KeyError: pass
+        with _PROCESS.lock:
+            if key not in _PROCESS.resources: _PROCESS.resources[key] = fn(*args)
+            return _PROCESS.resources[key]
+    return wrapper
+
+def process_lru(maxsize: int):
+    """functools.lru_cache that survives reruns."""
+    def deco(fn):
+        with _PROCESS.lock:
+            return _PROCESS.resources.setdefault(("lru", fn.__qualname__), functools.lru_cache(maxsize=maxsize)(fn))
+    return deco
+
+# =========================
+# Instrumentation: spans (this rerun's waterfall + process-wide latency quantiles) and counters
+# =========================
+DEV_PANEL = secret("DEV_PANEL", False)        # sidebar waterfall for every session (or add ?dev=1 to the URL)
+METRICS_PORT = int(secret("METRICS_PORT", 0))  # >0 → Prometheus text on :PORT/metrics, JSON on /metrics.json
+METRICS_RESERVOIR = 2048                       # most recent samples per span kept for p50/p95/p99
+TRACE = {"t0": time.perf_counter(), "spans": []}  # this rerun's spans; module state is fresh on every rerun
+_span_local = threading.local()
+
+class Metrics:
+    """One per process: recent durations per span name and labelled counters (cache results, upstream
+    requests, bytes and tokens)."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}   # span → deque of seconds
+        self.totals = {}    # span → (count, seconds) since start
+        self.counters = {}  # (metric, ((label, value), ...)) → n
+
+    def observe(self, name: str, seconds: float):
+        with self.lock:
+            self.samples.setdefault(name, collections.deque(maxlen=METRICS_RESERVOIR)).append(seconds)
+            n, total = self.totals.get(name, (0, 0.0))
+            self.totals[name] = (n + 1, total + seconds)
+
+    def count(self, metric: str, n: int = 1, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self.lock: self.counters[key] = self.counters.get(key, 0) + n
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            samples = {k: np.fromiter(v, dtype=np.float64) for k, v in self.samples.items()}
+            totals, counters = dict(self.totals), dict(self.counters)
+        spans = {}
+        for name, xs in samples.items():
+            p50, p95, p99 = np.quantile(xs, [0.5, 0.95, 0.99])
+            spans[name] = {"count": totals[name][0], "sum": totals[name][1], "p50": p50, "p95": p95, "p99": p99}
+        return {"spans": spans, "counters": [{"metric": m, **dict(labels), "value": v}
+                                            for (m, labels), v in sorted(counters.items())]}
+
+    def prometheus(self) -> str:
+        snap, out = self.snapshot(), []
+        out.append("# TYPE newsagent_span_seconds summary")
+        for name, s in sorted(snap["spans"].items()):
+            for q in ("p50", "p95", "p99"):
+                out.append(f'newsagent_span_seconds{{span="{name}",quantile="0.{q[1:]}"}} {s[q]:.6f}')
+            out.append(f'newsagent_span_seconds_count{{span="{name}"}} {s["count"]}')
+            out.append(f'newsagent_span_seconds_sum{{span="{name}"}} {s["sum"]:.6f}')
+        seen = set()
+        for c in snap["counters"]:
+            metric = f"newsagent_{c['metric']}_total"
+            if metric not in seen: out.append(f"# TYPE {metric} counter"); seen.add(metric)
+            labels = ",".join(f'{k}="{v}"' for k, v in c.items() if k not in ("metric", "value"))
+            out.append(f"{metric}{{{labels}}} {c['value']}")
+        return "\n".join(out) + "\n"
+
+@process_resource
+def metrics() -> Metrics:
+    return Metrics()
+
+@contextlib.contextmanager
+def span(name: str):
+    """Time a block: always into the process quantiles, and into this rerun's waterfall when run for a session."""
+    depth = getattr(_span_local, "depth", 0)
+    _span_local.depth = depth + 1
+    t = time.perf_counter()
     try:
-        return dtparse.parse(iso).astimezone(IST).strftime("%d %b, %H:%M IST")
-    except:
-        return ""
+        yield
+    finally:
+        dt = time.perf_counter() - t
+        _span_local.depth = depth
+        metrics().observe(name, dt)
+        # the ingester and SWR refreshes run old reruns' code with no session; keep their spans out of TRACE
+        if get_script_run_ctx(suppress_warning=True) is not None and len(TRACE["spans"]) < 5000:
+            TRACE["spans"].append((name, t - TRACE["t0"], dt, threading.current_thread().name, depth))
+
+def timed(name: str | None = None):
+    """Decorator form of span(); the span is named after the function unless given."""
+    def deco(fn):
+        label = name or fn.__name__
+        if inspect.isgeneratorfunction(fn):  # a stream: time it until it is exhausted
+            @functools.wraps(fn)
+            def gen(*args, **kwargs):
+                with span(label): yield from fn(*args, **kwargs)
+            return gen
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label): return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+def cache_data(**kwargs):
+    """st.cache_data that also counts hits and misses (a miss is a run of the function body)."""
+    def deco(fn):
+        ran = threading.local()
+        @functools.wraps(fn)
+        def body(*args, **kw):
+            ran.miss = True
+            return fn(*args, **kw)
+        cached = st.cache_data(**kwargs)(body)
+        @functools.wraps(fn)
+        def wrapper(*args, **kw):
+            ran.miss = False
+            out = cached(*args, **kw)
+            count_cache(fn.__name__, "miss" if ran.miss else "hit")
+            return out
+        wrapper.clear = cached.clear
+        return wrapper
+    return deco
+
+def count_cache(cache: str, result: str, n: int = 1):
+    """result is "hit", "miss" or "stale" (served while refreshing)."""
+    if n: metrics().count("cache", n, cache=cache, result=result)
+
+def _upstream(url: str) -> str:
+    if url.startswith(NEWSAPI_BASE): return "newsapi"
+    if url.startswith(OPENAI_BASE): return "openai"
+    return "rss"
+
+def count_http(r, *args, **kwargs):
+    """requests response hook: requests and bytes per upstream (streamed bodies are counted by their reader)."""
+    up, m = _upstream(r.url), metrics()
+    m.count("upstream_requests", upstream=up, status=f"{r.status_code // 100}xx")
+    body = r.request.body
+    if body: m.count("upstream_bytes", len(body), upstream=up, direction="out")
+    size = r.headers.get("Content-Length")
+    if size is None and not r.headers.get("Content-Type", "").startswith("text/event-stream"):
+        size = len(r.content)
+    if size: m.count("upstream_bytes", int(size), upstream=up, direction="in")
+    return r
+
+def count_tokens(usage: dict | None, upstream: str = "openai"):
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if (usage or {}).get(kind): metrics().count("upstream_tokens", usage[kind], upstream=upstream, kind=kind[:-7])
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, ctype = json.dumps(metrics().snapshot(), default=float).encode(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, ctype = metrics().prometheus().encode(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404); return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args): pass
+
+@process_resource
+def metrics_server():
+    """Serve metrics() on METRICS_PORT; with several app processes only the first to bind it does."""
+    try: server = ThreadingHTTPServer(("0.0.0.0", METRICS_PORT), _MetricsHandler)
+    except OSError as e:
+        print(f"[metrics] port {METRICS_PORT}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+@process_lru(maxsize=4096)
+def keyword_matcher(groups: tuple) -> KeywordMatcher:
+    """Compiled once per process for each ((group, (keywords...)), ...) set."""
+    return KeywordMatcher(dict(groups))
+
+def _groups(d: dict) -> tuple:
+    return tuple((g, tuple(ws)) for g, ws in d.items())
+
+LOW_SIG_MATCHER = keyword_matcher(_groups({"low_signal": LOW_SIG}))
+ROLE_MATCHER = keyword_matcher(_groups(ROLE_KEYWORDS))
+ARTICLE_TAGGER = keyword_matcher(_groups({f"hint:{g}": ws for g, ws in HINT_KEYWORDS.items()}))
+
+@process_lru(maxsize=20000)
+def _article_text(title: str, desc: str, source: str) -> str:
+    return " ".join([title, desc, source]).lower()
+
+@process_lru(maxsize=20000)
+def _text_tags(text: str) -> frozenset:
+    return ARTICLE_TAGGER.scan(text)
+
+def article_text(a) -> str:
+    """Normalized (lowercased title + desc + source) text, computed once per article."""
+    return _article_text(a.get("title",""), a.get("desc",""), a.get("source",""))
+
+def article_tags(a) -> frozenset:
+    """Every hint:* keyword group the article mentions (cached per article text)."""
+    return _text_tags(article_text(a))
+
+@process_lru(maxsize=50000)
+def published_epoch(published) -> float | None:
+    """UTC epoch seconds for a NewsAPI (ISO-8601) or RSS (RFC-822) timestamp; None if unparseable.
+    Naive times are taken as UTC. dateutil is only the last resort: it is far slower than the fast paths."""
+    if not published: return None
+    try:
+        dt = datetime.fromisoformat(published)
+    except ValueError:
+        try:
+            dt = email.utils.parsedate_to_datetime(published)
+        except (TypeError, ValueError, IndexError):
+            try: dt = dtparse.parse(published)
+            except (ValueError, OverflowError): return None
+    if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def article_ts(a) -> float | None:
+    return a["ts"] if "ts" in a else published_epoch(a.get("published") or "")
+
+@process_lru(maxsize=50000)
+def _ist_label(minute: int) -> str:
+    return datetime.fromtimestamp(minute * 60, IST).strftime("%d %b, %H:%M IST")
+
+def as_ist(value):
+    """'16 Oct, 15:30 IST' from an epoch or a published string; cached per minute."""
+    ts = value if isinstance(value, (int, float)) else published_epoch(value or "")
+    return _ist_label(int(ts // 60)) if ts is not None else ""
 
 def domain_of(url: str) -> str:
     try: return url.split("/")[2].replace("www.","")
     except: return ""
 
+def _source_name(a) -> str:
+    src = a.get("source")  # NewsAPI: {"id", "name"}; RSS items and shaped articles: plain str
+    return (src.get("name") if isinstance(src, dict) else src) or ""
+
+class Article:
+    """One shaped news item. Slotted (no per-instance dict), with interned source/domain and the parsed
+    epoch; a["field"], a.get() and `in` keep the dict-style call sites working."""
+    __slots__ = ("title", "url", "source", "published", "ts", "image", "desc", "alts", "domain")
+
+    def __init__(self, title, url, source, published="", ts=None, image=None, desc="", alts=None, domain=None):
+        self.title, self.url, self.published, self.ts, self.image, self.desc = title, url, published, ts, image, desc
+        self.source = sys.intern(source)
+        self.domain = sys.intern(domain if domain is not None else domain_of(url))
+        self.alts = alts if isinstance(alts, list) else list(alts or [])
+
+    def __getitem__(self, k):
+        try: return getattr(self, k)
+        except AttributeError: raise KeyError(k) from None
+
+    def get(self, k, default=None):
+        return getattr(self, k, default)
+
+    def __contains__(self, k):
+        return k in Article.__slots__
+
+    def __reduce__(self):
+        return (Article, tuple(getattr(self, f) for f in Article.__slots__))
+
+def _batch_from_columns(*cols):
+    b = ArticleBatch()
+    b.cols, b.rows = list(cols), [None] * (len(cols[0]) if cols else 0)
+    return b
+
+class ArticleBatch:
+    """Ordered articles stored column-wise (one list per Article field). filter/take work on index arrays,
+    pickling (which st.cache_data does on every hit) is just a few flat lists, and Article rows are only
+    materialized for the positions actually read — e.g. the one page of cards on screen."""
+    __slots__ = ("cols", "rows")
+
+    def __init__(self, items=()):
+        items = list(items)
+        self.rows = [Article(**a) if isinstance(a, dict) else a for a in items]
+        self.cols = [[getattr(a, f) for a in self.rows] for f in Article.__slots__]
+
+    def column(self, name: str) -> list:
+        return self.cols[Article.__slots__.index(name)]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice): return self.take(range(len(self.rows))[i])
+        row = self.rows[i]
+        if row is None:
+            row = self.rows[i] = Article(*(c[i] for c in self.cols))
+        return row
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self.rows)))
+
+    def take(self, idx) -> "ArticleBatch":
+        idx = [int(i) for i in idx]
+        b = ArticleBatch()
+        b.cols = [[c[i] for i in idx] for c in self.cols]
+        b.rows = [self.rows[i] for i in idx]
+        return b
+
+    def filter(self, mask) -> "ArticleBatch":
+        return self.take(i for i, keep in enumerate(mask) if keep)
+
+    def __reduce__(self):
+        return (_batch_from_columns, tuple(self.cols))
+
+def as_batch(items) -> ArticleBatch:
+    return items if hasattr(items, "take") else ArticleBatch(items)
+
 def is_low_signal(a):
-    src = (a.get("source") or {}).get("name") or ""
+    src = _source_name(a)
     if src in TABLOID: return True
-    title = (a.get("title") or "").lower()
-    return any(k in title for k in LOW_SIG)
+    return LOW_SIG_MATCHER.any((a.get("title") or "").lower())
 
+@timed()
 def shape(arts):
     out, seen = [], set()
     for a in arts:
         title = (a.get("title") or "").strip()
         url = a.get("url")
-        src = (a.get("source") or {}).get("name") or a.get("source") or "Source"
+        src = _source_name(a) or "Source"
         if not title or not url: continue
         k = title + url
         if k in seen or is_low_signal(a): continue
         seen.add(k)
-        out.append({
-            "title": title,
-            "url": url,
-            "source": src,
-            "published": a.get("publishedAt") or a.get("pubDate") or a.get("published") or "",
-            "image": a.get("urlToImage"),
-            "desc": (a.get("description") or a.get("summary") or a.get("content") or "")[:1000]
-        })
-    now_utc = datetime.now(timezone.utc)
+        published = a.get("publishedAt") or a.get("pubDate") or a.get("published") or ""
+        out.append(Article(
+            title=title,
+            url=url,
+            source=src,
+            published=published,
+            ts=a["ts"] if "ts" in a else published_epoch(published),  # parsed once, here
+            image=a.get("urlToImage") or a.get("image"),
+            desc=(a.get("description") or a.get("summary") or a.get("content") or a.get("desc") or "")[:1000],
+            alts=a.get("alts"),
+        ))
+    now = time.time()
     def score(item):
         s = 0
-        if item["source"] in MAJOR: s += 1.0
-        try:
-            dt = dtparse.parse(item["published"]) or now_utc
-            if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
-            hrs = (now_utc - dt.astimezone(timezone.utc)).total_seconds()/3600
+        if item.source in MAJOR: s += 1.0
+        if item.ts is not None:
+            hrs = (now - item.ts)/3600
             if hrs <= 24: s += 1.2
             elif hrs <= 48: s += 0.4
-        except: pass
         return s
     out.sort(key=score, reverse=True)
+    return ArticleBatch(cluster_near_duplicates(out))
+
+# Near-duplicate stories (same wire copy / same event across outlets): MinHash over word 1-2 gram shingles,
+# LSH banding for candidates, so one card (one teaser, one embedding) per story with the rest as alternates.
+MINHASH_PERMS, LSH_BANDS, DUP_JACCARD = 64, 32, 0.45
+_MH_PRIME = (1 << 31) - 1
+_MH_A, _MH_B = np.random.default_rng(2024).integers(1, _MH_PRIME, size=(2, MINHASH_PERMS, 1), dtype=np.uint64)
+
+def _shingles(item):
+    words = [w for w in re.findall(r"[a-z0-9]+", item["title"].lower()) if len(w) > 2]
+    words += [w for w in re.findall(r"[a-z0-9]+", item["desc"][:200].lower()) if len(w) > 2][:25]
+    grams = set(words) | {a + " " + b for a, b in zip(words, words[1:])}
+    return np.fromiter((zlib.crc32(g.encode()) & _MH_PRIME for g in grams), dtype=np.uint64, count=len(grams))
+
+@timed()
+def cluster_near_duplicates(items):
+    """Keep the first (best-scored) item of each near-duplicate cluster; others go to its "alts"."""
+    if len(items) < 2: return items
+    sigs = np.full((len(items), MINHASH_PERMS), _MH_PRIME, dtype=np.uint64)
+    for i, it in enumerate(items):
+        sh = _shingles(it)
+        if len(sh): sigs[i] = ((_MH_A * sh + _MH_B) % _MH_PRIME).min(axis=1)
+    parent = list(range(len(items)))
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]; i = parent[i]
+        return i
+    rows = MINHASH_PERMS // LSH_BANDS
+    for b in range(LSH_BANDS):
+        buckets = {}
+        for i, band in enumerate(map(bytes, sigs[:, b*rows:(b+1)*rows])):
+            j = buckets.setdefault(band, i)
+            if j != i and find(i) != find(j) and np.mean(sigs[i] == sigs[j]) >= DUP_JACCARD:
+                parent[max(find(i), find(j))] = min(find(i), find(j))  # lower index = better score stays head
+    out, head_of = [], {}
+    for i, it in enumerate(items):
+        root = find(i)
+        if root == i:
+            head_of[i] = it; out.append(it)
+        else:
+            alts = head_of[root]["alts"]
+            if it["url"] not in {x["url"] for x in alts}:
+                alts.append({"source": it["source"], "url": it["url"]})
+            alts.extend(x for x in it["alts"] if x["url"] != head_of[root]["url"])
     return out
 
 def apply_exclusions(articles, exclude_kws):
     if not exclude_kws: return articles
-    out = []
-    for a in articles:
-        text = " ".join([a.get("title",""), a.get("desc",""), a.get("source","")]).lower()
-        if any(kw in text for kw in exclude_kws): continue
-        out.append(a)
-    return out
+    m = keyword_matcher((("kw", tuple(exclude_kws)),))
+    b = as_batch(articles)
+    texts = map(_article_text, b.column("title"), b.column("desc"), b.column("source"))
+    return b.filter([not m.any(t) for t in texts])
 
 def reorder_prioritize_local(items, country: str, n: int = 2):
     locals_set = set(LOCAL_DOMAINS.get(country, []))
-    local, other = [], []
-    for it in items:
-        (local if domain_of(it["url"]) in locals_set else other).append(it)
-    head = local[:n]
-    tail = [x for x in items if x not in head]
-    return head + tail
+    items = as_batch(items)
+    head = [i for i, d in enumerate(items.column("domain")) if d in locals_set][:n]
+    rest = set(head)
+    return items.take(head + [i for i in range(len(items)) if i not in rest])
 
 def clear_expanded_summaries():
     for k in list(st.session_state.keys()):
         if k.startswith("content_expand_"): del st.session_state[k]
+    cancel_speculative_llm()
+
+# =========================
+# Local SQLite (shared by Streamlit workers, replicas on the same disk, and restarts)
+# =========================
+CACHE_DIR = secret("CACHE_DIR", ".cache")
+
+@process_resource
+def _db_local():
+    return threading.local()
+
+def db(name: str, schema: str = "") -> sqlite3.Connection:
+    """Per-thread connection to CACHE_DIR/<name>.sqlite in WAL mode; `schema` runs once per connection."""
+    conns = _db_local().__dict__.setdefault("conns", {})
+    if name not in conns:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        c = sqlite3.connect(os.path.join(CACHE_DIR, f"{name}.sqlite"), timeout=10, isolation_level=None)
+        c.execute("PRAGMA journal_mode=WAL"); c.execute("PRAGMA synchronous=NORMAL")
+        if schema: c.executescript(schema)
+        conns[name] = c
+    return conns[name]
+
+# LLM responses: content-addressed by prompt hash + model + temperature, TTL + LRU bounded
+LLM_CACHE_MAX_ENTRIES = int(secret("LLM_CACHE_MAX_ENTRIES", 20000))
+
+def _llm_db():
+    return db("llm", """
+        CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT, expires REAL, last_hit REAL);
+        CREATE INDEX IF NOT EXISTS llm_cache_last_hit ON llm_cache(last_hit);
+    """)
+
+def llm_cache_key(messages, model, temperature, json_mode=False) -> str:
+    prompt = hashlib.sha256(json.dumps([messages, json_mode], sort_keys=True).encode()).hexdigest()
+    return f"{model}|{temperature}|{prompt}"
+
+def llm_cache_get(key):
+    try:
+        c = _llm_db()
+        row = c.execute("SELECT response, expires, last_hit FROM llm_cache WHERE key=?", (key,)).fetchone()
+        now = time.time()
+        if not row or row[1] < now:
+            count_cache("llm", "miss")
+            return None
+        count_cache("llm", "hit")
+        if now - row[2] > 60:  # LRU clock; coarse so hot keys don't turn every read into a write
+            c.execute("UPDATE llm_cache SET last_hit=? WHERE key=?", (now, key))
+        return row[0]
+    except sqlite3.Error:
+        return None
+
+def llm_cache_put(key, response, ttl):
+    try:
+        c = _llm_db()
+        now = time.time()
+        c.execute("INSERT OR REPLACE INTO llm_cache VALUES (?,?,?,?)", (key, response, now + ttl, now))
+        if hash(key) % 50 == 0:  # evict now and then, not on every write
+            c.execute("DELETE FROM llm_cache WHERE expires < ?", (now,))
+            c.execute("DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_hit DESC LIMIT -1 OFFSET ?)",
+                      (LLM_CACHE_MAX_ENTRIES,))
+    except sqlite3.Error:
+        pass
+
+# =========================
+# HTTP: one pooled keep-alive session + concurrent source fan-out
+# =========================
+SOURCE_DEADLINE = float(secret("SOURCE_DEADLINE", 8))  # seconds any single source may hold up a tab
+UA = "Mozilla/5.0 (compatible; NewsAgent/1.0)"
+
+@process_resource
+def http() -> requests.Session:
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+    s.mount("https://", adapter); s.mount("http://", adapter)
+    s.headers["User-Agent"] = UA
+    s.hooks["response"].append(count_http)
+    return s
+
+@process_resource
+def _fetch_pool():
+    return ThreadPoolExecutor(max_workers=24, thread_name_prefix="fetch")
+
+class SourcesUnavailable(RuntimeError):
+    """Every upstream source of a feed job failed; its last stored listing stays."""
+
+def fan_out(calls, deadline=SOURCE_DEADLINE, failed=None):
+    """Run source callables concurrently. Each entry is fn or (fn, deadline); results come back in
+    order, with [] for a source that failed or missed its deadline (it keeps running and warms caches).
+    Positions of those sources are appended to `failed` if given."""
+    ctx = get_script_run_ctx(suppress_warning=True)  # None in the ingester
+    def run(fn):
+        # set, not add_script_run_ctx: given None that keeps whatever session last used this pool thread,
+        # which would make the ingester's NewsAPI calls look interactive
+        setattr(threading.current_thread(), SCRIPT_RUN_CONTEXT_ATTR_NAME, ctx)
+        return fn()
+    start = time.monotonic()
+    jobs = [(c, deadline) if callable(c) else c for c in calls]
+    futs = [(_fetch_pool().submit(run, fn), dl) for fn, dl in jobs]
+    out = []
+    for i, (fut, dl) in enumerate(futs):
+        try: out.append(fut.result(timeout=max(0.0, start + dl - time.monotonic())))
+        except Exception:  # includes the deadline's TimeoutError
+            out.append([])
+            if failed is not None: failed.append(i)
+    return out
+
+# Stale-while-revalidate: an expired entry is served at once while one background refresh per key runs, and an
+# upstream failure keeps serving the last good value, both until it is SWR_MAX_STALE past its ttl.
+SWR_MAX_STALE = int(secret("SWR_MAX_STALE", 3600))
+
+class SwrCache:
+    def __init__(self, max_entries):
+        self.lock = threading.Lock()
+        self.entries = {}  # key → (value, fetched_at)
+        self.refreshing = set()
+        self.max_entries = max_entries
+
+    def get(self, key):
+        with self.lock: return self.entries.get(key)
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.time())
+            if len(self.entries) > self.max_entries:
+                for k, _ in sorted(self.entries.items(), key=lambda kv: kv[1][1])[:len(self.entries) // 10]:
+                    del self.entries[k]
+
+    def refresh(self, key, fn, args, kwargs):
+        with self.lock:
+            if key in self.refreshing: return  # someone is already on it
+            self.refreshing.add(key)
+        def run():
+            try: self.put(key, fn(*args, **kwargs))
+            except Exception as e: print(f"[swr] {fn.__name__}: {e}")  # keep serving the stale copy
+            finally:
+                with self.lock: self.refreshing.discard(key)
+        _swr_pool().submit(run)
+
+@process_resource
+def _swr_cache(name: str, max_entries: int) -> SwrCache:
+    return SwrCache(max_entries)
+
+@process_resource
+def _swr_pool():
+    # refreshes run without a ScriptRunContext: they are background work (NewsAPI schedules them that way)
+    logging.getLogger("streamlit.runtime.scriptrunner.script_run_context").addFilter(_NoCtxWarning())
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="swr")
+
+def swr_cache(ttl: int, max_stale: int | None = None, max_entries: int = 1000):
+    """Process-wide cache like st.cache_data(ttl), with stale-while-revalidate. Values are shared, not copied."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = _swr_cache(fn.__qualname__, max_entries)
+            key = text_hash(json.dumps([args, kwargs], sort_keys=True, default=str))
+            hit = cache.get(key)
+            age = time.time() - hit[1] if hit is not None else None
+            if age is not None and age < ttl:
+                count_cache(f"swr.{fn.__name__}", "hit")
+                return hit[0]
+            if age is not None and age < ttl + (SWR_MAX_STALE if max_stale is None else max_stale):
+                count_cache(f"swr.{fn.__name__}", "stale")
+                cache.refresh(key, fn, args, kwargs)
+                return hit[0]
+            count_cache(f"swr.{fn.__name__}", "miss")
+            value = fn(*args, **kwargs)  # nothing servable: block, as st.cache_data would
+            cache.put(key, value)
+            return value
+        return wrapper
+    return deco
+
+# =========================
+# Record / replay: REPLAY_MODE="record" saves every upstream answer (NewsAPI, RSS, OpenAI chat and embeddings)
+# as a JSON fixture under REPLAY_DIR; "replay" answers only from those, so the pipeline runs offline and
+# deterministically, with no keys and no network
+# =========================
+REPLAY_MODE = str(secret("REPLAY_MODE", "")).lower()  # "", "record" or "replay"
+REPLAY_DIR = secret("REPLAY_DIR", "fixtures")
+
+class ReplayMiss(LookupError):
+    pass
+
+def _fixture_path(name: str, args, kwargs) -> str:
+    return os.path.join(REPLAY_DIR, name, text_hash(json.dumps([args, kwargs], sort_keys=True, default=str)) + ".json")
+
+def _fixture_load(path: str, name: str):
+    try:
+        with open(path) as f: return json.load(f)["result"]
+    except FileNotFoundError:
+        raise ReplayMiss(f"no recorded {name} call {os.path.basename(path)}") from None
+
+def _fixture_save(path: str, name: str, args, kwargs, result):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp, "w") as f: json.dump({"call": name, "args": [args, kwargs], "result": result}, f, default=str)
+    os.replace(tmp, path)
+
+def recorded(name: str, stream: bool = False):
+    """Record/replay one upstream call (a no-op unless REPLAY_MODE is set). A streaming call is recorded as
+    its joined text and replayed word by word."""
+    def deco(fn):
+        if REPLAY_MODE not in ("record", "replay"): return fn
+        if stream:
+            @functools.wraps(fn)
+            def gen(*args, **kwargs):
+                path = _fixture_path(name, args, kwargs)
+                if REPLAY_MODE == "replay":
+                    yield from re.findall(r"\S+\s*", _fixture_load(path, name))
+                    return
+                parts = []
+                for part in fn(*args, **kwargs):
+                    parts.append(part)
+                    yield part
+                _fixture_save(path, name, args, kwargs, "".join(parts))
+            return gen
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            path = _fixture_path(name, args, kwargs)
+            if REPLAY_MODE == "replay": return _fixture_load(path, name)
+            result = fn(*args, **kwargs)
+            _fixture_save(path, name, args, kwargs, result)
+            return result
+        return call
+    return deco
 
 # =========================
 # Optional RSS import (fail-safe)
@@ -156,22 +811,73 @@ try:
 except Exception:
     HAS_FEEDPARSER = False
 
+# Incremental ingestion: per-feed ETag/Last-Modified + seen entry ids; a 304 skips parsing entirely
+RSS_MIN_INTERVAL = int(secret("RSS_MIN_INTERVAL", 60))  # s between polls of one feed
+RSS_KEEP = 200  # entries kept per feed
+
+def _rss_db():
+    return db("rss", """
+        CREATE TABLE IF NOT EXISTS rss_feeds (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, checked_at REAL);
+        CREATE TABLE IF NOT EXISTS rss_entries (feed_url TEXT, entry_id TEXT, seen_at REAL, pos INTEGER, item TEXT,
+                                                PRIMARY KEY (feed_url, entry_id));
+        CREATE INDEX IF NOT EXISTS rss_entries_recent ON rss_entries(feed_url, seen_at DESC, pos);
+    """)
+
+def rss_ingest(url) -> list[dict]:
+    """Poll one feed with a conditional GET; store and return only entries not seen before."""
+    c = _rss_db()
+    row = c.execute("SELECT etag, last_modified, checked_at FROM rss_feeds WHERE url=?", (url,)).fetchone()
+    now = time.time()
+    if row and now - (row[2] or 0) < RSS_MIN_INTERVAL: return []
+    headers = {}
+    if row and row[0]: headers["If-None-Match"] = row[0]
+    if row and row[1]: headers["If-Modified-Since"] = row[1]
+    fetch_url = f"{RSS_BASE}/rss?u={requests.utils.quote(url, safe='')}" if RSS_BASE else url
+    r = http().get(fetch_url, headers=headers, timeout=SOURCE_DEADLINE)
+    if r.status_code == 304:
+        c.execute("UPDATE rss_feeds SET checked_at=? WHERE url=?", (now, url))
+        return []
+    r.raise_for_status()
+    feed = feedparser.parse(r.content)
+    src = feed.feed.get("title") or "RSS"
+    seen = {e for (e,) in c.execute("SELECT entry_id FROM rss_entries WHERE feed_url=?", (url,))}
+    new, rows = [], []
+    for pos, e in enumerate(feed.entries):
+        eid = e.get("id") or e.get("link") or e.get("title")
+        if not eid or eid in seen: continue
+        seen.add(eid)
+        item = {
+            "title": e.get("title","").strip(), "url": e.get("link",""), "source": src,
+            "published": e.get("published") or e.get("updated") or "", "image": None,
+            "desc": (e.get("summary") or e.get("description") or "")[:1000]
+        }
+        new.append(item)
+        rows.append((url, eid, now, pos, json.dumps(item)))
+    c.execute("BEGIN")
+    try:
+        c.executemany("INSERT OR IGNORE INTO rss_entries VALUES (?,?,?,?,?)", rows)
+        c.execute("INSERT OR REPLACE INTO rss_feeds VALUES (?,?,?,?)",
+                  (url, r.headers.get("ETag"), r.headers.get("Last-Modified"), now))
+        c.execute("DELETE FROM rss_entries WHERE feed_url=? AND entry_id NOT IN (SELECT entry_id FROM rss_entries"
+                  " WHERE feed_url=? ORDER BY seen_at DESC, pos LIMIT ?)", (url, url, RSS_KEEP))
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK"); raise
+    return new
+
+@timed()
+@recorded("rss_pull")
 def rss_pull(url, limit=25):
     if not HAS_FEEDPARSER:
         return []  # silently skip if not installed
     try:
-        feed = feedparser.parse(url)
-        items = []
-        for e in feed.entries[:limit]:
-            title = e.get("title","").strip()
-            link  = e.get("link","")
-            desc  = (e.get("summary") or e.get("description") or "")[:1000]
-            pub   = e.get("published") or e.get("updated") or ""
-            items.append({
-                "title": title, "url": link, "source": (feed.feed.get("title") or "RSS"),
-                "published": pub, "image": None, "desc": desc
-            })
-        return items
+        rss_ingest(url)
+    except Exception:
+        pass  # serve whatever the local store already has
+    try:
+        rows = _rss_db().execute("SELECT item FROM rss_entries WHERE feed_url=? ORDER BY seen_at DESC, pos LIMIT ?",
+                                 (url, limit)).fetchall()
+        return [json.loads(r[0]) for r in rows]
     except Exception:
         return []
 
@@ -181,11 +887,11 @@ def rss_pull(url, limit=25):
 def init_memory():
     st.session_state.setdefault("bookmarks", set())
     st.session_state.setdefault("feedback", [])  # {url, title, label:+1/-1, ts}
-init_memory()
 
-def remember_feedback(url, title, label):
+def remember_feedback(url, title, label, text=None):
+    """`text` is what the article was embedded as, so a like can reuse that embedding."""
     fb = st.session_state["feedback"]
-    fb.append({"url": url, "title": title, "label": label, "ts": datetime.now(timezone.utc).isoformat()})
+    fb.append({"url": url, "title": title, "label": label, "text": text, "ts": datetime.now(timezone.utc).isoformat()})
     st.session_state["feedback"] = fb
 
 def toggle_bookmark(url):
@@ -197,83 +903,541 @@ def toggle_bookmark(url):
 # =========================
 # Embeddings (semantic For You) — SBERT if available, else OpenAI
 # =========================
-import os
-
-try:
-    from sentence_transformers import SentenceTransformer
-    HAS_SBERT = True
-except Exception:
-    HAS_SBERT = False
+# Probe only: importing sentence_transformers pulls in torch, so it is imported (and the model loaded) by a
+# warm-up thread at startup; For You ranks on interest keywords until that is done.
+HAS_SBERT = importlib.util.find_spec("sentence_transformers") is not None
+
+SBERT_MODEL = "all-MiniLM-L6-v2"
+OAI_EMBED_MODEL = "text-embedding-3-small"
+
+EMBED_WORKER_SOCKET = str(secret("EMBED_WORKER_SOCKET", ""))  # embed_worker.py's socket; "" = encode in-process
+
+class EmbedderNotReady(RuntimeError):
+    pass
+
+class EmbedWorkerClient:
+    """SentenceTransformer-shaped client for embed_worker.py, which micro-batches requests from every
+    session and process onto its own encoder processes."""
+    def __init__(self, path: str):
+        self.path = path
+        self._up_until = 0.0
+
+    def _call(self, req: dict, timeout: float):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(timeout)
+            s.connect(self.path)
+            s.sendall(json.dumps(req).encode() + b"\n")
+            f = s.makefile("rb")
+            header = json.loads(f.readline() or b"{}")
+            if "error" in header or not header: raise RuntimeError(f"embed worker: {header.get('error', 'no reply')}")
+            if "n" not in header: return header, None
+            n, dim = header["n"], header["dim"]
+            return header, np.frombuffer(f.read(4 * n * dim), dtype=np.float32).reshape(n, dim)
+
+    def available(self) -> bool:
+        if time.monotonic() < self._up_until: return True
+        try: self._call({"op": "ping"}, timeout=0.5)
+        except (OSError, RuntimeError, ValueError): return False
+        self._up_until = time.monotonic() + 5
+        return True
+
+    def encode(self, texts, normalize_embeddings=True):
+        return self._call({"texts": list(texts)}, timeout=60)[1]
+
+class Embedder:
+    """The SBERT encoder once ready: the embed worker if one is configured, else the in-process model loaded
+    by the warm-up thread; None (OpenAI path) if SBERT is absent or failed to load."""
+    def __init__(self):
+        self.model, self.import_s, self.load_s = None, None, None
+        self.ready = threading.Event()
+        if EMBED_WORKER_SOCKET:
+            self.model = EmbedWorkerClient(EMBED_WORKER_SOCKET)
+            self.ready.set()
+            return
+        if not HAS_SBERT:
+            self.ready.set()
+            return
+        threading.Thread(target=self._warm_up, name="embedder-warmup", daemon=True).start()
+
+    def _warm_up(self):
+        try:
+            t = time.perf_counter()
+            from sentence_transformers import SentenceTransformer
+            self.import_s = time.perf_counter() - t
+            t = time.perf_counter()
+            self.model = SentenceTransformer(SBERT_MODEL)
+            self.load_s = time.perf_counter() - t
+            print(f"[embedder] sentence_transformers import {self.import_s:.1f}s, {SBERT_MODEL} load {self.load_s:.1f}s")
+        except Exception as e:
+            print(f"[embedder] SBERT unavailable, using OpenAI embeddings: {e}")
+        finally:
+            self.ready.set()
+
+    def is_ready(self) -> bool:
+        if hasattr(self.model, "available"): return self.model.available()  # worker down → keywords
+        return self.ready.is_set()
+
+@process_resource
+def embedder() -> Embedder:
+    return Embedder()
+
+def embedder_ready() -> bool:
+    return embedder().is_ready()
 
-@st.cache_resource(show_spinner=False)
 def get_embedder():
-    if HAS_SBERT:
-        return SentenceTransformer("all-MiniLM-L6-v2")
-    return None  # OpenAI path
+    e = embedder()
+    if not e.is_ready():
+        raise EmbedderNotReady(f"{SBERT_MODEL} is still loading")
+    return e.model  # None → OpenAI path
 
+@recorded("oai_embed")
 def _oai_embed(batch_texts):
     """OpenAI embeddings fallback (text-embedding-3-small)."""
     if not batch_texts:
         return []
-    url = "https://api.openai.com/v1/embeddings"
+    url = f"{OPENAI_BASE}/embeddings"
     headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
-    payload = {"model": "text-embedding-3-small", "input": batch_texts}
-    r = requests.post(url, headers=headers, json=payload, timeout=60)
+    payload = {"model": OAI_EMBED_MODEL, "input": batch_texts}
+    r = http().post(url, headers=headers, json=payload, timeout=60)
     r.raise_for_status()
-    data = r.json()["data"]
-    return [item["embedding"] for item in data]
-
-def embed_texts(texts):
+    body = r.json()
+    count_tokens(body.get("usage"))
+    return [item["embedding"] for item in body["data"]]
+
+class EmbeddingStore:
+    """Append-only float32 matrix (CACHE_DIR/emb-<model>[.<gen>].f32, memory-mapped) with a content-hash → row index
+    in SQLite. compact() copies the rows still wanted into the next generation's file; row numbers are only
+    meaningful together with the generation they were looked up in."""
+    def __init__(self, model: str):
+        self.model = model
+        self.dim = None
+        self._mm = {}  # generation → memmap
+        self._lock = threading.Lock()
+
+    def _path(self, gen: int) -> str:
+        return os.path.join(CACHE_DIR, f"emb-{self.model}.f32" if gen == 0 else f"emb-{self.model}.{gen}.f32")
+
+    def _index(self):
+        c = db("emb", """
+            CREATE TABLE IF NOT EXISTS emb_index (model TEXT, hash TEXT, row INTEGER, PRIMARY KEY (model, hash));
+            CREATE TABLE IF NOT EXISTS emb_dim (model TEXT PRIMARY KEY, dim INTEGER);
+            CREATE TABLE IF NOT EXISTS emb_gen (model TEXT PRIMARY KEY, gen INTEGER);
+        """)
+        if self.dim is None:
+            row = c.execute("SELECT dim FROM emb_dim WHERE model=?", (self.model,)).fetchone()
+            self.dim = row[0] if row else None
+        return c
+
+    def _gen(self, c) -> int:
+        row = c.execute("SELECT gen FROM emb_gen WHERE model=?", (self.model,)).fetchone()
+        return row[0] if row else 0
+
+    def generation(self) -> int:
+        return self._gen(self._index())
+
+    def _matrix(self, gen: int, need_rows: int):
+        with self._lock:  # remap only when another writer grew the file past our mapping
+            mm = self._mm.get(gen)
+            if mm is None or len(mm) < need_rows:
+                n = os.path.getsize(self._path(gen)) // (4 * self.dim)
+                mm = self._mm[gen] = np.memmap(self._path(gen), dtype=np.float32, mode="r", shape=(n, self.dim))
+                for g in [g for g in self._mm if g < gen - 1]: del self._mm[g]
+            return mm
+
+    def lookup(self, hashes) -> tuple[int, dict]:
+        """(generation, hash → row of that generation's file) for the hashes that are stored."""
+        c = self._index()
+        if self.dim is None or not hashes: return self._gen(c), {}
+        rows = {}
+        uniq = list(set(hashes))
+        c.execute("BEGIN")  # one snapshot: compact() swaps the index and the generation together
+        try:
+            gen = self._gen(c)
+            for i in range(0, len(uniq), 500):
+                chunk = uniq[i:i+500]
+                q = f"SELECT hash, row FROM emb_index WHERE model=? AND hash IN ({','.join('?'*len(chunk))})"
+                rows.update(c.execute(q, (self.model, *chunk)).fetchall())
+        finally:
+            c.execute("COMMIT")
+        return gen, rows
+
+    def rows(self, hashes) -> dict:
+        """hash → row of the current matrix file, for the hashes that are stored."""
+        return self.lookup(hashes)[1]
+
+    def vectors(self, rows, gen: int) -> np.ndarray:
+        """(len(rows), dim) copy of the given rows of generation gen's matrix."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows): return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self._matrix(gen, int(rows.max()) + 1)[rows])
+
+    def get(self, hashes) -> dict:
+        gen, rows = self.lookup(hashes)
+        if not rows: return {}
+        mm = self._matrix(gen, max(rows.values()) + 1)
+        return {h: np.array(mm[r]) for h, r in rows.items()}
+
+    def count(self) -> int:
+        return self._index().execute("SELECT COUNT(*) FROM emb_index WHERE model=?", (self.model,)).fetchone()[0]
+
+    def put(self, hashes, vecs):
+        vecs = np.ascontiguousarray(vecs, dtype=np.float32)
+        if not len(hashes) or vecs.ndim != 2: return
+        c = self._index()
+        if self.dim is None:
+            c.execute("INSERT OR IGNORE INTO emb_dim VALUES (?,?)", (self.model, vecs.shape[1]))
+            self.dim = c.execute("SELECT dim FROM emb_dim WHERE model=?", (self.model,)).fetchone()[0]
+        if vecs.shape[1] != self.dim: return
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        while True:
+            gen = self._gen(c)
+            with open(self._path(gen), "ab") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)  # row numbers must match file order across processes
+                try:
+                    if self._gen(c) != gen: continue  # compacted while we waited: append to the new file
+                    start = f.seek(0, os.SEEK_END) // (4 * self.dim)
+                    f.write(vecs.tobytes()); f.flush()
+                    c.executemany("INSERT OR IGNORE INTO emb_index VALUES (?,?,?)",
+                                  [(self.model, h, start + i) for i, h in enumerate(hashes)])
+                    return
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def compact(self, keep) -> int:
+        """Copy only the rows of the `keep` hashes into the next generation's file and switch every reader to it
+        (the previous file stays for readers still holding its row numbers); returns the rows dropped."""
+        c = self._index()
+        if self.dim is None: return 0
+        gen = self._gen(c)
+        with open(self._path(gen), "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)  # no appends while we copy
+            try:
+                if self._gen(c) != gen: return 0  # another process just did it
+                rows = c.execute("SELECT hash, row FROM emb_index WHERE model=?", (self.model,)).fetchall()
+                live = sorted((r, h) for h, r in rows if h in keep)
+                if len(live) == len(rows): return 0
+                old = self._matrix(gen, max(r for _, r in rows) + 1)
+                with open(self._path(gen + 1), "wb") as out:
+                    for i in range(0, len(live), 8192):
+                        out.write(np.ascontiguousarray(old[[r for r, _ in live[i:i+8192]]]).tobytes())
+                c.execute("BEGIN IMMEDIATE")
+                try:
+                    c.execute("DELETE FROM emb_index WHERE model=?", (self.model,))
+                    c.executemany("INSERT INTO emb_index VALUES (?,?,?)",
+                                  [(self.model, h, i) for i, (_, h) in enumerate(live)])
+                    c.execute("INSERT OR REPLACE INTO emb_gen VALUES (?,?)", (self.model, gen + 1))
+                    c.execute("COMMIT")
+                except Exception:
+                    c.execute("ROLLBACK"); raise
+                if gen and os.path.exists(self._path(gen - 1)): os.remove(self._path(gen - 1))
+                return len(rows) - len(live)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+@process_resource
+def embedding_store(model: str) -> EmbeddingStore:
+    return EmbeddingStore(model)
+
+def embed_text_of(a) -> str:
+    """What an article's embedding is computed from."""
+    return a["title"] + " " + (a.get("desc") or "")
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+def embed_model_name(model) -> str:
+    return SBERT_MODEL if model is not None else OAI_EMBED_MODEL
+
+@timed()
+def embed_texts(texts, persist: bool = True):
+    """float32 matrix (len(texts), dim); only texts missing from the embedding store are sent to the model (and
+    stored, unless persist=False: one-off texts like search queries would only grow the store)."""
     if not texts:
-        return []
+        return np.zeros((0, 0), dtype=np.float32)
     model = get_embedder()
-    if model is not None:
-        # SBERT path
-        return model.encode(texts, normalize_embeddings=True).tolist()
-    # OpenAI fallback
-    return _oai_embed(texts)
-
-def cosine_sim(a, b):
-    return sum(x*y for x,y in zip(a,b))
-
-def build_profile_vector(profile):
-    likes = [f["title"] for f in st.session_state.get("feedback", []) if f["label"] == +1][-5:]
-    parts = [
-        f"role: {profile.get('role','')}",
-        f"interests: {', '.join(profile.get('interests',[]))}",
-        f"country: {profile.get('country','')}",
-        f"liked: {', '.join(likes)}"
-    ]
-    text = " | ".join([p for p in parts if p.strip()])
-    vecs = embed_texts([text]) or [[0.0]*1536]  # OpenAI vector size
-    return vecs[0]
-
-# =========================
-# NewsAPI calls
-# =========================
-@st.cache_data(ttl=180, show_spinner=False)
+    store = embedding_store(embed_model_name(model))
+    hashes = [text_hash(t) for t in texts]
+    have = store.get(hashes)
+    by_hash = dict(zip(hashes, texts))
+    miss = [h for h in by_hash if h not in have]
+    count_cache("embeddings", "hit", len(by_hash) - len(miss))
+    count_cache("embeddings", "miss", len(miss))
+    if miss:
+        todo = [by_hash[h] for h in miss]
+        with span("embed.encode"):
+            if model is not None:
+                # SBERT path
+                vecs = model.encode(todo, normalize_embeddings=True)
+            else:
+                # OpenAI fallback
+                vecs = _oai_embed(todo)
+        vecs = np.asarray(vecs, dtype=np.float32)
+        if persist: store.put(miss, vecs)
+        have.update(zip(miss, vecs))
+    return np.stack([have[h] for h in hashes])
+
+def ranking_boosts(items, liked_urls=frozenset(), now=None):
+    """Per-article boost vector: MAJOR source +0.05, published in the last 24h +0.08, liked +0.1."""
+    now = now or datetime.now(timezone.utc).timestamp()
+    items = as_batch(items)
+    n = len(items)
+    major = np.fromiter((s in MAJOR for s in items.column("source")), dtype=bool, count=n)
+    ts = np.array([np.nan if t is None else t for t in items.column("ts")], dtype=np.float64)
+    liked = np.fromiter((u in liked_urls for u in items.column("url")), dtype=bool, count=n)
+    with np.errstate(invalid="ignore"):
+        recent = (now - ts) / 3600 <= 24  # NaN (unparseable) → False
+    return (0.05 * major + 0.08 * recent + 0.1 * liked).astype(np.float32)
+
+def keyword_scores(items, terms):
+    """Share of the user's interest terms each article mentions: the For You ranking until embeddings are up."""
+    items = as_batch(items)
+    if not terms: return np.zeros(len(items), dtype=np.float32)
+    m = keyword_matcher(tuple((t.lower(), (t.lower(),)) for t in terms))
+    texts = map(_article_text, items.column("title"), items.column("desc"), items.column("source"))
+    return np.array([len(m.scan(t)) for t in texts], dtype=np.float32) / len(terms)
+
+def rank_scores(profile_vecs, art_vecs, boosts):
+    """(K, n) scores for K profile vectors against n unit-normalized article vectors in one product."""
+    P = np.atleast_2d(np.asarray(profile_vecs, dtype=np.float32))
+    A = np.asarray(art_vecs, dtype=np.float32)
+    if A.ndim != 2 or P.shape[1] != A.shape[1]:  # e.g. profile embedded by a different model
+        return np.broadcast_to(boosts, (len(P), len(boosts))).copy()
+    return P @ A.T + boosts
+
+PROFILE_LIKE_WEIGHT = 0.2  # how far one like pulls the profile vector toward the liked article
+PROFILE_MAX_LIKES = 20     # likes replayed when the base vector is rebuilt
+
+def _profile_text(profile) -> str:
+    parts = [f"role: {profile.get('role','')}", f"interests: {', '.join(profile.get('interests',[]))}",
+             f"country: {profile.get('country','')}"]
+    return " | ".join(parts)
+
+def _blend_like(vec, liked):
+    v = (1 - PROFILE_LIKE_WEIGHT) * vec + PROFILE_LIKE_WEIGHT * liked
+    n = np.linalg.norm(v)
+    return v / n if n else vec
+
+@timed()
+def build_profile_vector(profile) -> np.ndarray:
+    """Unit profile vector in the active embedder's space: role/interests/country embedded once per profile
+    fingerprint (kept in the session), then each like blended in, in order, from the liked article's embedding."""
+    model = embed_model_name(get_embedder())
+    text = _profile_text(profile)
+    fp = text_hash(model + "|" + text)
+    likes = [f for f in st.session_state.get("feedback", []) if f["label"] == +1 and f.get("text")]
+    pv = st.session_state.get("profile_vec")
+    if pv is None or pv["fp"] != fp:  # new profile (or embedder): one embed, then replay recent likes
+        base = embed_texts([text])[0]
+        pv = {"fp": fp, "vec": base / (np.linalg.norm(base) or 1), "blended": max(0, len(likes) - PROFILE_MAX_LIKES)}
+        st.session_state["profile_vec"] = pv
+    if pv["blended"] < len(likes):
+        texts = [f["text"] for f in likes[pv["blended"]:]]
+        try:  # liked cards were usually embedded when they were ranked; one liked during warm-up is embedded now
+            vecs = list(embed_texts(texts))
+        except Exception:  # embedder down: blend the stored ones up to the first missing, retry that one next run
+            have = embedding_store(model).get([text_hash(t) for t in texts])
+            vecs = list(itertools.takewhile(lambda v: v is not None, (have.get(text_hash(t)) for t in texts)))
+        vec = pv["vec"]
+        for v in vecs:
+            if v.shape == vec.shape: vec = _blend_like(vec, v)
+        pv["vec"], pv["blended"] = vec, pv["blended"] + len(vecs)
+    return pv["vec"]
+
+# =========================
+# NewsAPI calls: a shared daily budget, coalesced requests, interactive before background
+# =========================
+NEWSAPI_DAILY_BUDGET = int(secret("NEWSAPI_DAILY_BUDGET", 100))            # free developer tier
+NEWSAPI_INTERACTIVE_RESERVE = int(secret("NEWSAPI_INTERACTIVE_RESERVE", 20))  # background refreshes never spend these
+NEWSAPI_FRESH = int(secret("NEWSAPI_FRESH", 180))  # s a stored response answers the same query from any process
+NEWSAPI_CONCURRENCY = 4
+NEWSAPI_PACE_BURST = 12  # background requests allowed ahead of the pro-rata pace (about one ingest cycle)
+NEWSAPI_BACKOFF = 900  # s to stop calling after a 429 that has no Retry-After
+
+class NewsApiQuotaExceeded(RuntimeError):
+    pass
+
+def _newsapi_db():
+    return db("newsapi", """
+        CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, fetched_at REAL, body BLOB);
+        CREATE TABLE IF NOT EXISTS quota (day TEXT PRIMARY KEY, used INTEGER, blocked_until REAL);
+    """)
+
+def _quota_day() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+def newsapi_budget() -> tuple[int, int]:
+    """(requests spent today, daily budget), across every process sharing CACHE_DIR."""
+    row = _newsapi_db().execute("SELECT used FROM quota WHERE day=?", (_quota_day(),)).fetchone()
+    return (row[0] if row else 0), NEWSAPI_DAILY_BUDGET
+
+def newsapi_ahead_of_pace() -> bool:
+    """Today's spend is past the background share pro-rated over the UTC day (plus one cycle's burst)."""
+    now = datetime.now(timezone.utc)
+    elapsed = (now - now.replace(hour=0, minute=0, second=0, microsecond=0)).total_seconds() / 86400
+    share = (NEWSAPI_DAILY_BUDGET - NEWSAPI_INTERACTIVE_RESERVE) * elapsed + NEWSAPI_PACE_BURST
+    return newsapi_budget()[0] >= share
+
+def _spend_quota(interactive: bool) -> bool:
+    c, day = _newsapi_db(), _quota_day()
+    c.execute("INSERT OR IGNORE INTO quota VALUES (?, 0, 0)", (day,))
+    limit = NEWSAPI_DAILY_BUDGET - (0 if interactive else NEWSAPI_INTERACTIVE_RESERVE)
+    return c.execute("UPDATE quota SET used = used + 1 WHERE day=? AND used < ? AND blocked_until <= ?",
+                     (day, limit, time.time())).rowcount == 1
+
+def _rate_limited(retry_after):
+    try: wait = float(retry_after)
+    except (TypeError, ValueError): wait = NEWSAPI_BACKOFF
+    _newsapi_db().execute("UPDATE quota SET blocked_until=? WHERE day=?", (time.time() + wait, _quota_day()))
+
+def _response_get(key):
+    row = _newsapi_db().execute("SELECT fetched_at, body FROM responses WHERE key=?", (key,)).fetchone()
+    if row is None: return None, None
+    return json.loads(zlib.decompress(row[1])), time.time() - row[0]
+
+def _response_put(key, articles):
+    c, now = _newsapi_db(), time.time()
+    c.execute("INSERT OR REPLACE INTO responses VALUES (?,?,?)", (key, now, zlib.compress(json.dumps(articles).encode())))
+    c.execute("DELETE FROM responses WHERE fetched_at < ?", (now - STORE_MAX_AGE_DAYS * 86400,))
+
+class NewsApiScheduler:
+    """One per process. Identical queries in flight share one request; at most NEWSAPI_CONCURRENCY run at once,
+    and a waiting interactive request (a page render) always goes before background refreshes (the ingester)."""
+    def __init__(self):
+        self.cv = threading.Condition()
+        self.running = 0
+        self.interactive_waiting = 0
+        self.inflight = {}
+
+    def _acquire(self, interactive):
+        with self.cv:
+            if interactive: self.interactive_waiting += 1
+            try:
+                while self.running >= NEWSAPI_CONCURRENCY or (not interactive and self.interactive_waiting):
+                    self.cv.wait()
+            finally:
+                if interactive: self.interactive_waiting -= 1
+            self.running += 1
+
+    def _release(self):
+        with self.cv:
+            self.running -= 1
+            self.cv.notify_all()
+
+    def get(self, endpoint: str, params: dict, interactive: bool):
+        key = text_hash(endpoint + "?" + json.dumps(params, sort_keys=True))
+        body, age = _response_get(key)
+        if body is not None and age < NEWSAPI_FRESH:
+            count_cache("newsapi", "hit")
+            return body
+        with self.cv:
+            fut, owner = self.inflight.get(key), False
+            if fut is None:
+                fut, owner = Future(), True
+                self.inflight[key] = fut
+        if not owner:
+            count_cache("newsapi", "coalesced")
+            return fut.result()
+        try:
+            fut.set_result(self._fetch(key, endpoint, params, interactive))
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self.cv: self.inflight.pop(key, None)
+        return fut.result()
+
+    def _fetch(self, key, endpoint, params, interactive):
+        self._acquire(interactive)
+        try:
+            body, age = _response_get(key)  # another process may have fetched it while we queued
+            if body is not None and age < NEWSAPI_FRESH:
+                count_cache("newsapi", "hit")
+                return body
+            if not _spend_quota(interactive):
+                count_cache("newsapi", "stale" if body is not None else "miss")
+                if body is not None: return body  # out of budget: an older answer beats none
+                raise NewsApiQuotaExceeded("NewsAPI daily budget spent or rate-limited")
+            count_cache("newsapi", "miss")
+            r = http().get(f"{NEWSAPI_BASE}/{endpoint}", params={**params, "apiKey": NEWSAPI_KEY}, timeout=20)
+            if r.status_code == 429:
+                _rate_limited(r.headers.get("Retry-After"))
+                if body is not None: return body
+                raise NewsApiQuotaExceeded("NewsAPI rate limit hit")
+            r.raise_for_status()
+            articles = r.json().get("articles", [])
+            _response_put(key, articles)
+            return articles
+        finally:
+            self._release()
+
+@process_resource
+def newsapi() -> NewsApiScheduler:
+    return NewsApiScheduler()
+
+def newsapi_get(endpoint: str, params: dict):
+    # page renders carry a ScriptRunContext (fan_out passes it to its workers); the ingester deliberately doesn't
+    interactive = get_script_run_ctx(suppress_warning=True) is not None
+    with span(f"newsapi.{endpoint}"):
+        return newsapi().get(endpoint, params, interactive)
+
+# Uncached on purpose: the scheduler's response store (NEWSAPI_FRESH) answers repeats, and an SWR layer here would
+# hand the ingester the previous cycle's listing to store as freshly ingested.
+@recorded("news_top")
 def news_top(params: dict):
-    url = "https://newsapi.org/v2/top-headlines"
-    p = {**params, "apiKey": NEWSAPI_KEY}
-    p.setdefault("pageSize", 30)
-    r = requests.get(url, params=p, timeout=20)
-    r.raise_for_status()
-    return r.json().get("articles", [])
+    return newsapi_get("top-headlines", {"pageSize": 30, **params})
 
-@st.cache_data(ttl=180, show_spinner=False)
-def news_everything(q: str, days: int = 2):
-    url = "https://newsapi.org/v2/everything"
+@recorded("news_everything")
+def news_everything(q: str, days: int = 2, page_size: int = 50):
     since = (datetime.now(timezone.utc) - timedelta(days=days)).date().isoformat()
-    p = {"q": q, "from": since, "sortBy": "publishedAt", "language": "en", "pageSize": 50, "apiKey": NEWSAPI_KEY}
-    r = requests.get(url, params=p, timeout=20)
-    r.raise_for_status()
-    return r.json().get("articles", [])
+    return newsapi_get("everything", {"q": q, "from": since, "sortBy": "publishedAt", "language": "en",
+                                      "pageSize": page_size})
+
+# For You: instead of one OR query per user, each interest term hashes to a bucket and the bucket's query ORs
+# every active user's terms in it, so overlapping interests share (coalesced, cached) queries; each user's
+# pool is then filtered locally to the articles that mention their own terms.
+UNION_BUCKETS = int(secret("UNION_BUCKETS", 4))
+NEWSAPI_Q_MAX = 500  # NewsAPI's limit on q
+UNION_MAX_TERMS = int(secret("UNION_MAX_TERMS", 20))  # more terms → each one's share of the 100 newest results shrinks
+
+def _term_bucket(term: str) -> int:
+    return zlib.crc32(term.encode()) % UNION_BUCKETS
+
+def _q_term(term: str) -> str:
+    return f'"{term}"' if " " in term else term
+
+def active_interest_terms() -> set[str]:
+    rows = _store_db().execute("SELECT args FROM ingest_jobs WHERE kind='foryou' AND last_requested > ?",
+                               (time.time() - INGEST_ACTIVE_WINDOW,)).fetchall()
+    return {t.lower() for (args,) in rows for t in json.loads(args)[0]}
+
+def union_queries(terms) -> list[str]:
+    """The shared queries that cover `terms`."""
+    mine = {t.lower() for t in terms}
+    active = active_interest_terms() | mine
+    out = []
+    for b in sorted({_term_bucket(t) for t in mine}):
+        chunk, size = [], 0
+        for t in sorted(t for t in active if _term_bucket(t) == b):
+            q = _q_term(t)
+            if chunk and (size + len(q) + 4 > NEWSAPI_Q_MAX or len(chunk) >= UNION_MAX_TERMS):
+                if mine.intersection(chunk): out.append(" OR ".join(map(_q_term, chunk)))
+                chunk, size = [], 0
+            chunk.append(t); size += len(q) + 4
+        if mine.intersection(chunk): out.append(" OR ".join(map(_q_term, chunk)))
+    return out
+
+def own_query(terms) -> str:
+    """Just this user's terms, ORed, within NEWSAPI_Q_MAX."""
+    out, size = [], 0
+    for t in terms:
+        q = _q_term(t)
+        if out and size + len(q) + 4 > NEWSAPI_Q_MAX: break
+        out.append(q); size += len(q) + 4
+    return " OR ".join(out)
 
 # =========================
-# Fetchers (For You / Categories / Global / National via RSS blend)
+# Source pools (what the ingester pulls for each feed job; shaped, not yet localized)
 # =========================
-@st.cache_data(ttl=240, show_spinner=False)
-def fetch_for_you(interests: list[str], country: str | None, profile_vec=None):
+def for_you_terms(interests) -> list[str]:
     terms = [t.strip() for t in (interests or []) if t.strip()]
     seen, cleaned = set(), []
     for t in terms:
@@ -281,143 +1445,817 @@ def fetch_for_you(interests: list[str], country: str | None, profile_vec=None):
         if k not in seen:
             seen.add(k); cleaned.append(t)
         if len(cleaned) >= 12: break
+    return cleaned
 
-    pool_raw = []
+def for_you_pool(cleaned: list[str], country: str | None):
+    items = ArticleBatch([])
     if cleaned:
-        pool_raw += news_everything(" OR ".join(cleaned), days=2)
-
-    if len(pool_raw) < 12 and country:
+        queries, failed = union_queries(cleaned), []
+        union = [a for res in fan_out([lambda q=q: news_everything(q, days=2, page_size=100) for q in queries],
+                                      failed=failed) for a in res]
+        if queries and len(failed) == len(queries): raise SourcesUnavailable("NewsAPI unavailable")
+        items = shape(union)
+        mine = keyword_matcher((("terms", tuple(t.lower() for t in cleaned)),))
+        items = items.filter([mine.any(article_text(a)) for a in items])
+        own_terms = {_q_term(t.lower()) for t in cleaned}  # union queries are built from lowercased terms
+        shared = any(set(q.split(" OR ")) - own_terms for q in queries)
+        if len(items) < 12 and shared:  # crowded out by busier terms in the shared queries: ask for ours alone
+            own = own_query(cleaned)
+            items = shape([*items, *fan_out([lambda: news_everything(own, days=2, page_size=100)])[0]])
+
+    if len(items) < 12 and country:
         geo = COUNTRY_KEYWORDS.get(country, [])[:8]
-        if geo:
-            pool_raw += news_everything(" OR ".join((cleaned or []) + geo), days=3)
+        if geo:  # shared per country; the user's own terms are already covered above
+            items = shape([*items, *news_everything(" OR ".join(geo), days=3)])
 
-    if len(pool_raw) < 12:
-        pool_raw += news_everything("technology OR business OR startups OR policy OR finance OR education", days=2)
+    if len(items) < 12:
+        items = shape([*items, *news_everything("technology OR business OR startups OR policy OR finance OR education", days=2)])
 
-    items = shape(pool_raw)
-    if not items: return []
+    return items
 
-    if profile_vec is None:
-        items = reorder_prioritize_local(items, country or "in", n=2)
-        return items[:60]
+def category_pool(category: str, country: str):
+    calls = [lambda c=c: news_top({"category": c, "country": country}) for c in TOP_CATEGORIES.get(category, [])]
+    q = CATEGORY_QUERIES.get(category, "")
+    if q:
+        calls.append(lambda: news_everything(q, days=2))
+    # India RSS costs no NewsAPI quota, so pull it alongside and blend below only if needed
+    with_rss = country == "in" and category in ("tech","finance","economy","health")
+    if with_rss:
+        calls += [lambda u=u: rss_pull(u, limit=15) for u in INDIA_RSS]
+
+    failed = []
+    results = fan_out(calls, failed=failed)
+    n_api = len(calls) - (len(INDIA_RSS) if with_rss else 0)
+    if n_api and all(i in failed for i in range(n_api)): raise SourcesUnavailable("NewsAPI unavailable")
+    items = shape([a for res in results[:n_api] for a in res])
 
-    corpus = [(a["title"] + " " + (a.get("desc") or "")) for a in items]
-    art_vecs = embed_texts(corpus)
+    # Blend India RSS if needed
+    if with_rss and len(items) < 25:
+        items = shape([*items, *(a for res in results[n_api:] for a in res)])
+    return items
 
-    scored = []
-    for a, v in zip(items, art_vecs):
-        try: s = cosine_sim(profile_vec, v)
-        except: s = 0.0
-        boost = 0.0
-        if a["source"] in MAJOR: boost += 0.05
-        try:
-            dt = dtparse.parse(a["published"])
-            hrs = (datetime.now(timezone.utc) - dt.astimezone(timezone.utc)).total_seconds()/3600
-            if hrs <= 24: boost += 0.08
-        except: pass
-        if any(f["url"] == a["url"] and f["label"] == +1 for f in st.session_state.get("feedback", [])):
-            boost += 0.1
-        scored.append((s+boost, a))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    ranked = [a for _,a in scored]
-    ranked = reorder_prioritize_local(ranked, country or "in", n=2)
-    return ranked[:60]
+def global_pool():
+    pool, failed = [], []
+    for res in fan_out([lambda: news_everything(CATEGORY_QUERIES["global"], days=2),
+                        lambda: news_everything("india OR europe OR china OR middle east OR us OR africa", days=2)],
+                       failed=failed):
+        pool += res
+    if len(failed) == 2: raise SourcesUnavailable("NewsAPI unavailable")
+    return shape(pool)
 
-@st.cache_data(ttl=240, show_spinner=False)
-def fetch_category(category: str, country: str):
-    pool = []
-    if category == "tech":
-        try: pool += news_top({"category":"technology", "country": country})
-        except: pass
-    if category == "health":
-        try: pool += news_top({"category":"health", "country": country})
-        except: pass
-    if category == "finance":
-        try: pool += news_top({"category":"business", "country": country})
-        except: pass
-    if category == "economy":
-        try:
-            pool += news_top({"category":"business", "country": country})
-            pool += news_top({"category":"general",  "country": country})
-        except: pass
+POOLS = {"foryou": for_you_pool, "category": category_pool, "global": global_pool}
 
-    q = CATEGORY_QUERIES.get(category, "")
-    if q:
-        pool += news_everything(q, days=2)
+# =========================
+# Article store (SQLite) + background ingestion — page renders only read
+# =========================
+INGEST_DAEMON = bool(secret("INGEST_DAEMON", True))
+INGEST_INTERVAL = int(secret("INGEST_INTERVAL", 600))              # s between refreshes of one feed job
+INGEST_ACTIVE_WINDOW = int(secret("INGEST_ACTIVE_WINDOW", 6*3600))  # unread this long → stop refreshing
+INGEST_COUNTRIES = [c.strip() for c in str(secret("INGEST_COUNTRIES", "in")).split(",") if c.strip()]
+STORE_MAX_AGE_DAYS = 7
+
+def _store_db():
+    return db("articles", """
+        CREATE TABLE IF NOT EXISTS articles (url TEXT PRIMARY KEY, title TEXT, source TEXT, domain TEXT, published TEXT,
+                                             published_ts REAL, image TEXT, desc TEXT, alts TEXT, ingested_at REAL);
+        CREATE INDEX IF NOT EXISTS articles_published ON articles(published_ts);
+        CREATE INDEX IF NOT EXISTS articles_domain ON articles(domain);
+        CREATE TABLE IF NOT EXISTS article_categories (category TEXT, url TEXT, rank INTEGER, PRIMARY KEY (category, url));
+        CREATE INDEX IF NOT EXISTS article_categories_rank ON article_categories(category, rank);
+        CREATE TABLE IF NOT EXISTS ingest_jobs (category TEXT PRIMARY KEY, kind TEXT, args TEXT,
+                                                last_requested REAL, last_ingested REAL);
+        CREATE TABLE IF NOT EXISTS digests (cohort TEXT PRIMARY KEY, built_at REAL, body BLOB);
+    """)
+
+def store_write(category: str, items):
+    c, now = _store_db(), time.time()
+    c.execute("BEGIN")
+    try:
+        c.executemany("INSERT OR REPLACE INTO articles VALUES (?,?,?,?,?,?,?,?,?,?)", [
+            (a["url"], a["title"], a["source"], domain_of(a["url"]), a["published"], article_ts(a),
+             a.get("image"), a.get("desc"), json.dumps(a.get("alts") or []), now) for a in items])
+        c.execute("DELETE FROM article_categories WHERE category=?", (category,))
+        c.executemany("INSERT OR IGNORE INTO article_categories VALUES (?,?,?)",
+                      [(category, a["url"], i) for i, a in enumerate(items)])
+        c.execute("UPDATE ingest_jobs SET last_ingested=? WHERE category=?", (now, category))
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK"); raise
+
+def _article_row(t, u, s, p, ts, i, d, al) -> Article:
+    return Article(t, u, s, p, ts, i, d or "", json.loads(al or "[]"))
+
+def store_read(category: str, limit: int = 200):
+    rows = _store_db().execute(
+        "SELECT a.title, a.url, a.source, a.published, a.published_ts, a.image, a.desc, a.alts FROM article_categories c"
+        " JOIN articles a ON a.url = c.url WHERE c.category=? ORDER BY c.rank LIMIT ?", (category, limit)).fetchall()
+    return ArticleBatch(_article_row(*r) for r in rows)
+
+def store_articles(urls) -> ArticleBatch:
+    """The stored articles for these urls, in the given order (unknown urls are skipped)."""
+    c, found = _store_db(), {}
+    for i in range(0, len(urls), 500):
+        chunk = urls[i:i+500]
+        found.update((r[1], r) for r in c.execute(
+            "SELECT title, url, source, published, published_ts, image, desc, alts FROM articles"
+            f" WHERE url IN ({','.join('?'*len(chunk))})", chunk))
+    return ArticleBatch(_article_row(*found[u]) for u in urls if u in found)
+
+def _job_touch(category: str, kind: str, args) -> float | None:
+    """Mark a feed job as wanted (so the ingester keeps it fresh); returns when it was last ingested."""
+    c, now = _store_db(), time.time()
+    row = c.execute("SELECT last_requested, last_ingested FROM ingest_jobs WHERE category=?", (category,)).fetchone()
+    if row is None:
+        c.execute("INSERT OR IGNORE INTO ingest_jobs VALUES (?,?,?,?,NULL)", (category, kind, json.dumps(args), now))
+        return None
+    if now - (row[0] or 0) > 60:
+        c.execute("UPDATE ingest_jobs SET last_requested=? WHERE category=?", (now, category))
+    return row[1]
+
+@timed()
+def run_job(category: str, kind: str, args):
+    items = POOLS[kind](*args)
+    if not items: raise SourcesUnavailable(f"no articles for {category}")  # an empty listing is never better
+    store_write(category, items)
+    try:
+        embed_texts([embed_text_of(a) for a in items])  # warm the embedding store
+        ann_add(items)
+    except Exception: pass
+    return items
+
+def read_or_ingest(category: str, kind: str, args):
+    """Local read; only a job nobody has ingested yet (or a stale one with the daemon off) hits upstream here."""
+    last = _job_touch(category, kind, args)
+    if last is None or (not INGEST_DAEMON and time.time() - last > INGEST_INTERVAL):
+        try: return run_job(category, kind, args)
+        except SourcesUnavailable: pass  # keep serving the last good listing
+    return store_read(category)
+
+def ingest_once():
+    c, now = _store_db(), time.time()
+    for country in INGEST_COUNTRIES:  # always keep the default cohorts warm
+        for cat in ("tech","finance","economy","health"):
+            _job_touch(f"{cat}:{country}", "category", [cat, country])
+    _job_touch("global", "global", [])
+    due = c.execute("SELECT category, kind, args FROM ingest_jobs WHERE last_requested > ?"
+                    " AND (last_ingested IS NULL OR last_ingested < ?) ORDER BY last_ingested",
+                    (now - INGEST_ACTIVE_WINDOW, now - INGEST_INTERVAL)).fetchall()
+    for i, (category, kind, args) in enumerate(due):  # stalest first
+        if newsapi_ahead_of_pace():  # spread the budget over the day instead of spending it by mid-morning
+            metrics().count("ingest_paced", len(due) - i)
+            break
+        try:
+            args = json.loads(args)
+            items = run_job(category, kind, args)
+            if kind in ("category", "global"): build_digests(kind, args, items)
+        except Exception as e: print(f"[ingest] {category}: {e}")
+    # articles stay as long as the semantic index can return them
+    c.execute("DELETE FROM articles WHERE published_ts < ? AND url NOT IN (SELECT url FROM article_categories)",
+              (now - max(STORE_MAX_AGE_DAYS, ANN_MAX_AGE_DAYS) * 86400,))
+    _ann_db().execute("DELETE FROM ann_entries WHERE ts < ?", (now - ANN_MAX_AGE_DAYS * 86400,))
+    compact_embeddings()
+
+def compact_embeddings():
+    """Rewrite each embedding store without the vectors no index entry uses any more (evicted articles, profile
+    texts), once they are at least half the file."""
+    models = [m for (m,) in _ann_db().execute("SELECT DISTINCT model FROM ann_entries")]
+    for model in models:
+        store = embedding_store(model)
+        keep = {h for (h,) in _ann_db().execute("SELECT hash FROM ann_entries WHERE model=?", (model,))}
+        if store.count() >= 2 * len(keep) + 1000:
+            print(f"[ingest] {model}: compacted {store.compact(keep)} stale embeddings")
+
+class _NoCtxWarning(logging.Filter):
+    # the ingester and SWR refreshes have no ScriptRunContext on purpose; don't log that on every cached call
+    def filter(self, record): return not record.threadName.startswith(("ingest", "swr"))
+
+def ingest_forever():
+    """Refresh due feed jobs every ~30 s. Only one process per CACHE_DIR ingests (flock); others stand by."""
+    logging.getLogger("streamlit.runtime.scriptrunner.script_run_context").addFilter(_NoCtxWarning())
+    embedder()
+    if METRICS_PORT: metrics_server()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    lock = open(os.path.join(CACHE_DIR, "ingest.lock"), "w")
+    while True:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except OSError:
+            time.sleep(30)
+    while True:
+        try: ingest_once()
+        except Exception as e: print(f"[ingest] cycle failed: {e}")
+        time.sleep(min(30, INGEST_INTERVAL))
+
+@process_resource
+def start_ingest_daemon():
+    t = threading.Thread(target=ingest_forever, name="ingest", daemon=True)
+    t.start()
+    return t
 
-    items = shape(pool)
+# =========================
+# Local semantic index (IVF over the embedding store): search, "more like this", For You recall
+# =========================
+ANN_MAX_AGE_DAYS = int(secret("ANN_MAX_AGE_DAYS", 30))  # articles older than this leave the index (and the store)
+ANN_NPROBE = int(secret("ANN_NPROBE", 8))                # inverted lists scanned per query
+ANN_TRAIN_MIN = 2000   # below this many entries a flat scan is as fast as probing lists
+ANN_RECALL = int(secret("ANN_RECALL", 100))  # For You candidates recalled from the index beside the keyword pool
+ANN_RECALL_DAYS = 3
+SEARCH_RESULTS = 30
+
+def _ann_db():
+    return db("ann", """
+        CREATE TABLE IF NOT EXISTS ann_entries (seq INTEGER PRIMARY KEY AUTOINCREMENT, model TEXT, hash TEXT,
+                                                url TEXT, ts REAL, UNIQUE (model, hash));
+        CREATE INDEX IF NOT EXISTS ann_entries_ts ON ann_entries(ts);
+    """)
+
+class AnnIndex:
+    """Inverted-file index for one embedding model. Entries (hash, url, ts) are appended to ann_entries by
+    whichever process ingested the article; each process syncs them by seq, keeps only row numbers (vectors
+    stay in the store's memory map; all rows are re-read after the store is compacted), trains spherical k-means
+    centroids once there are ANN_TRAIN_MIN entries (again whenever the index has grown 4×, dropping expired
+    entries), and answers a query by scanning the ANN_NPROBE lists whose centroids are nearest to it."""
+    def __init__(self, model: str):
+        self.model, self.store = model, embedding_store(model)
+        self.lock = threading.Lock()
+        self._reset(self.store.generation())
+
+    def _reset(self, gen: int):
+        """Forget everything: rows below are row numbers of the store's generation `gen`."""
+        self.gen, self.seq = gen, 0
+        self.rows, self.ts, self.urls = np.zeros(0, dtype=np.int64), np.zeros(0), []
+        self.centroids, self.assign, self.lists = None, np.zeros(0, dtype=np.int32), None
+        self.trained_at = 0
+
+    def _nearest(self, vecs) -> np.ndarray:
+        return np.argmax(vecs @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _assign_all(self) -> np.ndarray:
+        n = len(self.rows)
+        parts = [self._nearest(self.store.vectors(self.rows[i:i+8192], self.gen)) for i in range(0, n, 8192)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32)
+
+    def _sync(self):
+        gen = self.store.generation()
+        if gen != self.gen: self._reset(gen)  # the store was compacted: re-read every entry's new row
+        new = _ann_db().execute("SELECT seq, hash, url, ts FROM ann_entries WHERE model=? AND seq>? ORDER BY seq",
+                                (self.model, self.seq)).fetchall()
+        if not new: return
+        gen, rows = self.store.lookup([h for _, h, _, _ in new])
+        if gen != self.gen: return  # compacted just now; the next search starts over
+        self.seq = new[-1][0]
+        new = [(rows[h], u, t) for _, h, u, t in new if h in rows]
+        if not new: return
+        r = np.array([x[0] for x in new], dtype=np.int64)
+        self.rows = np.concatenate([self.rows, r])
+        self.ts = np.concatenate([self.ts, np.array([x[2] for x in new], dtype=np.float64)])
+        self.urls += [x[1] for x in new]
+        if self.centroids is not None:
+            self.assign = np.concatenate([self.assign, self._nearest(self.store.vectors(r, self.gen))])
+        self.lists = None
+        if len(self.rows) >= max(ANN_TRAIN_MIN, 4 * self.trained_at): self._train()
+
+    def _train(self, iters: int = 10):
+        live = self.ts >= time.time() - ANN_MAX_AGE_DAYS * 86400
+        self.rows, self.ts = self.rows[live], self.ts[live]
+        self.urls = [u for u, keep in zip(self.urls, live) if keep]
+        n = len(self.rows)
+        if n < ANN_TRAIN_MIN:
+            self.centroids, self.trained_at = None, n
+            return
+        k = int(np.clip(np.sqrt(n), 16, 1024))
+        rng = np.random.default_rng(0)
+        sample = self.store.vectors(np.sort(self.rows[rng.choice(n, min(n, 32 * k), replace=False)]), self.gen)
+        C = sample[rng.choice(len(sample), k, replace=False)]
+        for _ in range(iters):  # vectors are unit-norm: assign by dot product, renormalize the means
+            a = np.argmax(sample @ C.T, axis=1)
+            order = np.argsort(a, kind="stable")
+            used, starts = np.unique(a[order], return_index=True)
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            C[used] = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        self.centroids = C.astype(np.float32)
+        self.assign, self.lists, self.trained_at = self._assign_all(), None, n
+
+    def search(self, vec, k: int, min_ts: float | None = None, exclude=frozenset()) -> list[tuple[str, float]]:
+        """[(url, cosine)] of the k nearest live entries, best first."""
+        q = np.asarray(vec, dtype=np.float32).ravel()
+        with self.lock:
+            self._sync()
+            if not len(self.rows) or q.shape[0] != self.store.dim: return []
+            if self.centroids is None:
+                cand = np.arange(len(self.rows))
+            else:
+                if self.lists is None:
+                    order = np.argsort(self.assign, kind="stable")
+                    self.lists = (order, np.searchsorted(self.assign[order], np.arange(len(self.centroids) + 1)))
+                order, bounds = self.lists
+                probe = np.argsort(-(self.centroids @ q))[:ANN_NPROBE]
+                cand = np.concatenate([order[bounds[c]:bounds[c+1]] for c in probe])
+            cand = cand[self.ts[cand] >= max(min_ts or 0, time.time() - ANN_MAX_AGE_DAYS * 86400)]
+            rows, urls, gen = self.rows[cand], [self.urls[i] for i in cand], self.gen
+        if not len(rows): return []
+        scores = self.store.vectors(rows, gen) @ q
+        top = np.argsort(-scores, kind="stable")
+        out, seen = [], set(exclude)
+        for i in top:
+            if urls[i] in seen: continue
+            seen.add(urls[i])
+            out.append((urls[i], float(scores[i])))
+            if len(out) == k: break
+        return out
+
+@process_resource
+def ann_index(model: str) -> AnnIndex:
+    ann_backfill(model)
+    return AnnIndex(model)
+
+def ann_add(items, model: str | None = None):
+    """Register articles whose embeddings are already in the store (run_job embeds them first)."""
+    model = model or embed_model_name(get_embedder())
+    texts = {text_hash(embed_text_of(a)): a for a in items}
+    rows = embedding_store(model).rows(list(texts))
+    now = time.time()
+    _ann_db().executemany("INSERT OR IGNORE INTO ann_entries (model, hash, url, ts) VALUES (?,?,?,?)",
+                          [(model, h, texts[h]["url"], article_ts(texts[h]) or now) for h in texts if h in rows])
+
+def ann_backfill(model: str):
+    """Index every stored article embedded before the index existed (or by a process that didn't add it)."""
+    cutoff = time.time() - ANN_MAX_AGE_DAYS * 86400
+    rows = _store_db().execute("SELECT title, url, source, published, published_ts, image, desc, alts FROM articles"
+                               " WHERE published_ts IS NULL OR published_ts >= ?", (cutoff,)).fetchall()
+    for i in range(0, len(rows), 2000):
+        ann_add([_article_row(*r) for r in rows[i:i+2000]], model)
+
+def keyword_search(query: str, k: int = SEARCH_RESULTS, exclude=frozenset()) -> ArticleBatch:
+    """Newest stored articles mentioning every query word: search while the embedder warms up."""
+    words = re.findall(r"\w+", query.lower())[:6]
+    if not words: return ArticleBatch()
+    where = " AND ".join("(lower(title) LIKE ? OR lower(desc) LIKE ?)" for _ in words)
+    rows = _store_db().execute(
+        "SELECT title, url, source, published, published_ts, image, desc, alts FROM articles"
+        f" WHERE {where} ORDER BY published_ts DESC LIMIT ?", (*(f"%{w}%" for w in words for _ in (0, 1)), k + len(exclude))).fetchall()
+    return ArticleBatch([_article_row(*r) for r in rows if r[1] not in exclude][:k])
+
+@timed()
+def semantic_search(query: str, k: int = SEARCH_RESULTS) -> ArticleBatch:
+    """Stored articles nearest to a free-text query; never calls NewsAPI."""
+    if not embedder_ready(): return keyword_search(query, k)
+    model = embed_model_name(get_embedder())
+    hits = ann_index(model).search(embed_texts([query], persist=False)[0], k)
+    return store_articles([u for u, _ in hits])
+
+@timed()
+def more_like_this(article, k: int = SEARCH_RESULTS) -> ArticleBatch:
+    """Stored articles nearest to this one, minus the story itself and its other outlets."""
+    skip = {article["url"], *(x["url"] for x in article.get("alts") or [])}
+    if not embedder_ready(): return keyword_search(article["title"], k, exclude=skip)
+    model = embed_model_name(get_embedder())
+    hits = ann_index(model).search(embed_texts([embed_text_of(article)])[0], k, exclude=skip)
+    return store_articles([u for u, _ in hits])
+
+def recall_for_you(items, profile_vec):
+    """The keyword pool plus the index's recent articles nearest to the profile that its queries missed."""
+    try:
+        hits = ann_index(embed_model_name(get_embedder())).search(
+            profile_vec, ANN_RECALL, min_ts=time.time() - ANN_RECALL_DAYS * 86400, exclude=set(items.column("url")))
+    except (EmbedderNotReady, sqlite3.Error):
+        return items
+    extra = store_articles([u for u, _ in hits])
+    return ArticleBatch([*items, *extra]) if len(extra) else items
 
-    # Blend India RSS if needed
-    if country == "in" and len(items) < 25 and category in ("tech","finance","economy","health"):
-        rss_items = []
-        for u in INDIA_RSS:
-            rss_items.extend(rss_pull(u, limit=15))
-        items = shape(items + rss_items)
+# =========================
+# Fetchers (For You / Categories / Global / National via RSS blend)
+# =========================
+@timed()
+@swr_cache(ttl=60)
+def fetch_for_you(interests: list[str], country: str | None, profile_vec=None, liked=()):
+    cleaned = for_you_terms(interests)
+    items = read_or_ingest("foryou:" + text_hash(json.dumps([cleaned, country])), "foryou", [cleaned, country])
+    if profile_vec is not None and ANN_RECALL: items = recall_for_you(as_batch(items), profile_vec)
+    if not items: return []
+    return rank_for_you(items, cleaned, country, profile_vec, liked)
+
+def rank_for_you(items, terms, country, profile_vec=None, liked=()):
+    """Top 60 of a For You pool by profile similarity (keyword overlap while the embedder warms up) + boosts."""
+    items = as_batch(items)
+    boosts = ranking_boosts(items, frozenset(liked))
+    if profile_vec is None:  # embedder still warming up
+        scores = keyword_scores(items, terms) + boosts
+    else:
+        corpus = [t + " " + (d or "") for t, d in zip(items.column("title"), items.column("desc"))]
+        scores = rank_scores(profile_vec, embed_texts(corpus), boosts)[0]
+    order = np.argsort(-scores, kind="stable")
+    ranked = items.take(order)
+    ranked = reorder_prioritize_local(ranked, country or "in", n=2)
+    return ranked[:60]
 
+@timed()
+@swr_cache(ttl=60)
+def fetch_category(category: str, country: str):
+    items = read_or_ingest(f"{category}:{country}", "category", [category, country])
     items = reorder_prioritize_local(items, country, n=2)
     return items[:60]
 
-@st.cache_data(ttl=240, show_spinner=False)
+@timed()
+@swr_cache(ttl=60)
 def fetch_global(country: str):
-    pool = []
-    pool += news_everything(CATEGORY_QUERIES["global"], days=2)
-    pool += news_everything("india OR europe OR china OR middle east OR us OR africa", days=2)
-    items = shape(pool)
+    items = read_or_ingest("global", "global", [])
     items = reorder_prioritize_local(items, country, n=2)
     return items[:60]
 
 # =========================
 # OpenAI (teaser / expand / clarify)
 # =========================
-def openai_chat(messages, temperature=0.25, model="gpt-4o-mini"):
-    url = "https://api.openai.com/v1/chat/completions"
+EXPAND_TTL = 6 * 3600
+TEASER_TTL = 3600
+
+@timed()
+@recorded("openai_chat")
+def openai_chat(messages, temperature=0.25, model="gpt-4o-mini", json_mode=False, cache_ttl=None):
+    key = llm_cache_key(messages, model, temperature, json_mode) if cache_ttl else None
+    if key and (hit := llm_cache_get(key)) is not None: return hit
+    url = f"{OPENAI_BASE}/chat/completions"
     headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
     payload = {"model": model, "messages": messages, "temperature": temperature}
-    r = requests.post(url, headers=headers, json=payload, timeout=60)
+    if json_mode: payload["response_format"] = {"type": "json_object"}
+    r = http().post(url, headers=headers, json=payload, timeout=60)
     r.raise_for_status()
-    return r.json()["choices"][0]["message"]["content"].strip()
+    body = r.json()
+    count_tokens(body.get("usage"))
+    text = body["choices"][0]["message"]["content"].strip()
+    charge_session_tokens(messages, text, body.get("usage"))
+    if key: llm_cache_put(key, text, cache_ttl)
+    return text
+
+@timed()
+@recorded("openai_chat_stream", stream=True)
+def openai_chat_stream(messages, temperature=0.25, model="gpt-4o-mini", cache_ttl=None):
+    """Like openai_chat but yields text deltas as they arrive (server-sent events); a cache hit yields once."""
+    key = llm_cache_key(messages, model, temperature) if cache_ttl else None
+    if key and (hit := llm_cache_get(key)) is not None:
+        yield hit
+        return
+    url = f"{OPENAI_BASE}/chat/completions"
+    headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
+    payload = {"model": model, "messages": messages, "temperature": temperature, "stream": True,
+               "stream_options": {"include_usage": True}}  # the last chunk then carries token usage
+    parts, size, usage = [], 0, None
+    with http().post(url, headers=headers, json=payload, timeout=60, stream=True) as r:
+        r.raise_for_status()
+        for line in r.iter_lines(decode_unicode=True):
+            size += len(line) + 1
+            if not line or not line.startswith("data:"): continue
+            data = line[5:].strip()
+            if data == "[DONE]": break
+            chunk = json.loads(data)
+            count_tokens(chunk.get("usage"))
+            usage = chunk.get("usage") or usage
+            choices = chunk.get("choices") or [{}]
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                parts.append(delta)
+                yield delta
+    metrics().count("upstream_bytes", size, upstream="openai", direction="in")
+    charge_session_tokens(messages, "".join(parts), usage)
+    if key: llm_cache_put(key, "".join(parts).strip(), cache_ttl)
+
+TEASER_SYSTEM = (
+    "You write brief teasers for news cards.\n"
+    "RULES:\n"
+    "• 30–50 words total, 1–2 sentences.\n"
+    "• Use ONLY the provided title and snippet; do not invent facts.\n"
+    "• No bullet points. No fluff.\n"
+)
+
+def _teaser_style(level):
+    if level == "basic":
+        return "Use very simple words and short sentences. Define any jargon briefly. 30–50 words."
+    if level == "high":
+        return "Be crisp and technical if needed; include one precise term. 30–50 words."
+    return "Be clear and neutral. 30–50 words."
+
+def _clip_teaser(text):
+    words = text.split()
+    return (" ".join(words[:55]) + "…") if len(words) > 55 else text
+
+def _snippet_teaser(title, snippet):
+    base = snippet or title
+    words = base.split()
+    return " ".join(words[:45]) + ("…" if len(words) > 45 else "")
+
+def _teaser_messages(title, snippet, source, level, time_str):
+    user = {"title": title, "source": source, "time": time_str, "snippet": snippet, "style": _teaser_style(level)}
+    return [{"role": "system", "content": TEASER_SYSTEM}, {"role": "user", "content": json.dumps(user)}]
+
+# Per-card cache entries are keyed by the single-card prompt, so batch results and single calls share them
+def _teaser_get(args):
+    hit = llm_cache_get(llm_cache_key(_teaser_messages(*args), "gpt-4o-mini", 0.3))
+    return _clip_teaser(hit) if hit is not None else None
 
-@st.cache_data(ttl=3600, show_spinner=False)
+def _teaser_put(args, text):
+    llm_cache_put(llm_cache_key(_teaser_messages(*args), "gpt-4o-mini", 0.3), text, TEASER_TTL)
+
+@timed()
 def teaser_summary(title: str, snippet: str, source: str, level: str, time_str: str) -> str:
     try:
-        if level == "basic":
-            style = "Use very simple words and short sentences. Define any jargon briefly. 30–50 words."
-        elif level == "high":
-            style = "Be crisp and technical if needed; include one precise term. 30–50 words."
-        else:
-            style = "Be clear and neutral. 30–50 words."
-
-        system = (
-            "You write brief teasers for news cards.\n"
-            "RULES:\n"
-            "• 30–50 words total, 1–2 sentences.\n"
-            "• Use ONLY the provided title and snippet; do not invent facts.\n"
-            "• No bullet points. No fluff.\n"
-        )
-        user = {"title": title, "source": source, "time": time_str, "snippet": snippet, "style": style}
-        msgs = [{"role": "system", "content": system}, {"role": "user", "content": json.dumps(user)}]
-        text = openai_chat(msgs, temperature=0.3, model="gpt-4o-mini")
-        words = text.split()
-        return (" ".join(words[:55]) + "…") if len(words) > 55 else text
+        msgs = _teaser_messages(title, snippet, source, level, time_str)
+        return _clip_teaser(openai_chat(msgs, temperature=0.3, model="gpt-4o-mini", cache_ttl=TEASER_TTL))
+    except Exception:
+        return _snippet_teaser(title, snippet)
+
+@timed()
+def teaser_batch(keys) -> dict:
+    """Teasers for many cards (teaser_summary arg tuples, one level) in a single chat call."""
+    out = {k: hit for k in keys if (hit := _teaser_get(k)) is not None}
+    todo = [k for k in keys if k not in out]
+    if not todo: return out
+    system = TEASER_SYSTEM + (
+        "• You get a JSON list of articles, each with an id. Write one teaser per article.\n"
+        "• Reply with a JSON object mapping every id to its teaser string.\n"
+    )
+    user = {"style": _teaser_style(todo[0][3]),
+            "articles": [{"id": str(i), "title": k[0], "source": k[2], "time": k[4], "snippet": k[1]} for i, k in enumerate(todo)]}
+    msgs = [{"role": "system", "content": system}, {"role": "user", "content": json.dumps(user)}]
+    try:
+        # uncached: a malformed or partial reply must not be replayed; parsed teasers are cached per card below
+        got = json.loads(openai_chat(msgs, temperature=0.3, model="gpt-4o-mini", json_mode=True))
+        if len(got) == 1 and isinstance(next(iter(got.values())), dict): got = next(iter(got.values()))
     except Exception:
-        base = snippet or title
-        words = base.split()
-        return " ".join(words[:45]) + ("…" if len(words) > 45 else "")
+        got = {}
+    for i, k in enumerate(todo):
+        text = got.get(str(i)) if isinstance(got, dict) else None
+        if isinstance(text, str) and text.strip():
+            out[k] = _clip_teaser(text.strip())
+            _teaser_put(k, out[k])
+        else:
+            out[k] = _snippet_teaser(k[0], k[1])  # not cached, so the next rerun retries it
+    return out
+
+# =========================
+# LLM scheduler: one priority queue per process for teasers and speculative expansions
+# =========================
+LLM_CONCURRENCY = int(secret("LLM_CONCURRENCY", 16))          # chat calls in flight across all sessions
+LLM_SESSION_TOKENS = int(secret("LLM_SESSION_TOKENS", 60000))  # per session; past it, teasers fall back to snippets
+ABOVE_FOLD = int(secret("ABOVE_FOLD", 3))                      # cards assumed on screen before any scrolling
+SPECULATIVE_EXPANDS = int(secret("SPECULATIVE_EXPANDS", 3))    # top For You cards expanded before a click
+PRIO_VISIBLE, PRIO_OFFSCREEN, PRIO_SPECULATIVE, PRIO_BACKGROUND = 0, 1, 2, 3  # background: the ingester's digests
+
+class LlmBudgetExceeded(RuntimeError):
+    pass
+
+class LlmScheduler:
+    """One per process. Jobs run lowest priority first (FIFO within one), at most LLM_CONCURRENCY at a time.
+    Identical queued jobs share one run, at the most urgent priority any waiter asked for; a session that stops
+    waiting (a rerun, a profile change) only withdraws itself, and a job is dropped once nobody waits on it."""
+    def __init__(self):
+        self.cv = threading.Condition()
+        self.queue = []    # heap of (priority, seq, session, key, ctx, fn, future); may hold superseded entries
+        self.seq = itertools.count()
+        self.queued = {}   # future → its live heap entry
+        self.waiters = {}  # future → [(session, priority, ctx)], one per submit not yet withdrawn, while queued
+        self.pending = {}  # key → future, queued or running
+        self.spent = {}    # session id → [tokens, last charged]
+        for i in range(max(1, LLM_CONCURRENCY)):
+            threading.Thread(target=self._work, name=f"llm-{i}", daemon=True).start()
+
+    def submit(self, fn, priority: int, key=None) -> Future:
+        ctx = get_script_run_ctx(suppress_warning=True)
+        waiter = (ctx.session_id if ctx is not None else None, priority, ctx)
+        with self.cv:
+            shared = self.pending.get(key) if key is not None else None
+            if shared is not None and not shared.cancelled():  # a cancelled one is replaced
+                if shared in self.queued:  # e.g. a visible card sharing a queued digest chunk moves it up
+                    self.waiters[shared].append(waiter)
+                    self._requeue(shared)
+                return shared
+            fut = Future()
+            if key is not None: self.pending[key] = fut
+            self.waiters[fut] = [waiter]
+            self._push(priority, waiter[0], key, ctx, fn, fut)
+        return fut
+
+    def _push(self, priority, session, key, ctx, fn, fut):
+        """Queue (or re-queue, superseding the older entry) a job; caller holds cv."""
+        entry = (priority, next(self.seq), session, key, ctx, fn, fut)
+        heapq.heappush(self.queue, entry)
+        self.queued[fut] = entry
+        self.cv.notify()
+
+    def _requeue(self, fut):
+        """Run a queued job for its most urgent waiter (its priority, its session's budget and trace), or drop
+        it when none is left; caller holds cv."""
+        live, waiters = self.queued[fut], self.waiters[fut]
+        if not waiters:
+            del self.queued[fut], self.waiters[fut]
+            if self.pending.get(live[3]) is fut: del self.pending[live[3]]
+            fut.cancel()
+            return
+        session, priority, ctx = min(waiters, key=lambda w: w[1])
+        if (priority, session) != (live[0], live[2]): self._push(priority, session, live[3], ctx, live[5], fut)
+
+    def _withdraw(self, futs, pick) -> int:
+        """Remove the waiters pick(waiters) selects from each queued future; caller holds cv."""
+        dropped = 0
+        for fut in futs:
+            waiters = self.waiters.get(fut)  # None: running, done, or dropped already
+            gone = pick(waiters) if waiters else []
+            if not gone: continue
+            for w in gone: waiters.remove(w)
+            self._requeue(fut)
+            dropped += fut not in self.queued
+        if dropped:  # compact: dropped and superseded entries would otherwise sit in the heap until popped
+            self.queue = [job for job in self.queue if self.queued.get(job[6]) is job]
+            heapq.heapify(self.queue)
+        return dropped
+
+    def cancel(self, session, min_priority: int = PRIO_VISIBLE) -> int:
+        """Withdraw the session from its queued jobs at min_priority or lower urgency; returns how many jobs that
+        dropped (a job another session or the ingester still waits on stays queued)."""
+        with self.cv:
+            mine = lambda ws: [w for w in ws if w[0] == session and w[1] >= min_priority]
+            return self._withdraw(list(self.waiters), mine)
+
+    def release(self, futs) -> int:
+        """The calling session stops waiting on these futures (one of its submits each); see cancel."""
+        ctx = get_script_run_ctx(suppress_warning=True)
+        session = ctx.session_id if ctx is not None else None
+        with self.cv:
+            return self._withdraw(futs, lambda ws: [w for w in ws if w[0] == session][:1])
+
+    def charge(self, session, tokens: int):
+        now = time.time()
+        with self.cv:
+            entry = self.spent.setdefault(session, [0, now])
+            entry[0] += tokens; entry[1] = now
+            if len(self.spent) > 10000:  # forget sessions idle for a day
+                self.spent = {k: v for k, v in self.spent.items() if now - v[1] < 86400}
+
+    def over_budget(self, session) -> bool:
+        with self.cv: return self.spent.get(session, [0])[0] >= LLM_SESSION_TOKENS
+
+    def _work(self):
+        while True:
+            with self.cv:
+                while True:
+                    while not self.queue: self.cv.wait()
+                    entry = heapq.heappop(self.queue)
+                    if self.queued.get(entry[6]) is entry: break  # else superseded by a promotion
+                _, _, session, key, ctx, fn, fut = entry
+                del self.queued[fut], self.waiters[fut]
+            if fut.set_running_or_notify_cancel():
+                # the submitter's context: its token spend is charged to that session, and spans land in its trace
+                setattr(threading.current_thread(), SCRIPT_RUN_CONTEXT_ATTR_NAME, ctx)
+                try:
+                    if session is not None and self.over_budget(session):
+                        raise LlmBudgetExceeded("session LLM token budget spent")
+                    fut.set_result(fn())
+                except BaseException as e:
+                    fut.set_exception(e)
+                finally:
+                    setattr(threading.current_thread(), SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+            with self.cv:
+                if key is not None and self.pending.get(key) is fut: del self.pending[key]
+
+@process_resource
+def llm_scheduler() -> LlmScheduler:
+    return LlmScheduler()
+
+def charge_session_tokens(messages, text: str, usage=None):
+    """Bill a real (uncached) chat call to the calling session; the ingester's calls aren't anyone's."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None: return
+    tokens = (usage or {}).get("total_tokens") or (len(json.dumps(messages)) + len(text)) // 4
+    llm_scheduler().charge(ctx.session_id, tokens)
+
+def cancel_speculative_llm():
+    """Profile or level changed: queued off-screen teasers and prefetched expansions are for the old one."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is not None: llm_scheduler().cancel(ctx.session_id, min_priority=PRIO_OFFSCREEN)
+
+# =========================
+# Teaser engine (cards render first, teasers fill in concurrently, on-screen ones first)
+# =========================
+TEASER_BATCH_SIZE = int(secret("TEASER_BATCH_SIZE", 10))  # cards per chat call; 1 = one call per card
+TEASER_JOBS = []  # (slot, teaser_summary args, priority); module state is fresh on every rerun
+
+def queue_teaser(slot, title, snippet, source, level, time_str, priority=PRIO_OFFSCREEN):
+    slot.markdown('<div class="teaser pending">Summarizing…</div>', unsafe_allow_html=True)
+    TEASER_JOBS.append((slot, (title, snippet, source, level, time_str), priority))
+
+def _teaser_job(chunk):
+    if len(chunk) == 1: return {chunk[0]: teaser_summary(*chunk[0])}
+    return teaser_batch(chunk)
+
+@timed()
+def flush_teasers():
+    """Schedule every queued teaser (on-screen cards first) and fill slots as results come back."""
+    slots, prio = {}, {}
+    for slot, args, priority in TEASER_JOBS:  # same story in two tabs → one call
+        slots.setdefault(args, []).append(slot)
+        prio[args] = min(priority, prio.get(args, priority))
+    TEASER_JOBS.clear()
+    if not slots: return
+    def fill(args, text):
+        for slot in slots[args]:
+            slot.markdown(f'<div class="teaser">{text}</div>', unsafe_allow_html=True)
+
+    chunks, by_level = [], {}
+    for args in slots:
+        hit = _teaser_get(args)
+        if hit is not None: fill(args, hit)
+        else: by_level.setdefault(args[3], []).append(args)
+    size = max(1, TEASER_BATCH_SIZE)
+    for todo in by_level.values():
+        todo.sort(key=prio.get)  # stable: visible cards share the first batches, in page order
+        chunks += [todo[i:i+size] for i in range(0, len(todo), size)]
+    if not chunks: return
+
+    sched = llm_scheduler()
+    futs = {sched.submit(functools.partial(_teaser_job, chunk), prio[chunk[0]], key=("teaser", tuple(chunk))): chunk
+            for chunk in chunks}
+    try:
+        for fut in as_completed(futs):
+            try: got = fut.result()
+            except Exception: got = {}  # includes LlmBudgetExceeded and cancellation
+            for args in futs[fut]:
+                fill(args, got.get(args) or _snippet_teaser(args[0], args[1]))
+    finally:
+        # a rerun can interrupt us mid-flush; don't keep paying for cards nobody will see (chunks another
+        # session or the digest builder also waits on stay queued for them)
+        sched.release(futs)
+
+def prefetch_expansions(cards, profile):
+    """Queue expand_summary for the top For You cards at the user's level, behind all teaser work; a later
+    click then streams the cached analysis at once."""
+    level = profile["reading_level"]
+    for a in list(cards[:SPECULATIVE_EXPANDS]):
+        msgs = _expand_messages(a, profile, level)
+        if llm_cache_get(llm_cache_key(msgs, "gpt-4o-mini", 0.23)) is not None: continue
+        job = functools.partial(openai_chat, msgs, temperature=0.23, model="gpt-4o-mini", cache_ttl=EXPAND_TTL)
+        llm_scheduler().submit(job, PRIO_SPECULATIVE, key=("expand", llm_cache_key(msgs, "gpt-4o-mini", 0.23)))
+
+# =========================
+# Cohort digests: category tabs depend only on (tab, country) and teasers only on reading level, so after each
+# ingest the ingester publishes every cohort's ranked, teased card list and sessions just read the snapshot
+# =========================
+DIGEST_LEVELS = ("basic","normal","high")
+DIGEST_MAX_AGE = int(secret("DIGEST_MAX_AGE", 3 * INGEST_INTERVAL))  # older snapshots → live path
+
+def digest_countries() -> list[str]:
+    """Countries to publish the Global digest for: the always-warm ones plus any with an active category job."""
+    rows = _store_db().execute("SELECT args FROM ingest_jobs WHERE kind='category' AND last_requested > ?",
+                               (time.time() - INGEST_ACTIVE_WINDOW,)).fetchall()
+    return sorted(set(INGEST_COUNTRIES) | {json.loads(args)[1] for (args,) in rows})
+
+def _tease_cards(cards, level) -> dict:
+    """url → LLM teaser; cards that only got the snippet fallback are left to the live teaser engine."""
+    keys = [(a["title"], a.get("desc") or "", a["source"], level, as_ist(article_ts(a))) for a in cards]
+    size = max(1, TEASER_BATCH_SIZE)
+    chunks = [keys[i:i+size] for i in range(0, len(keys), size)]
+    futs = [llm_scheduler().submit(functools.partial(_teaser_job, chunk), PRIO_BACKGROUND, key=("teaser", tuple(chunk)))
+            for chunk in chunks]
+    got = {}
+    for fut in futs:
+        try: got.update(fut.result())
+        except Exception: pass  # e.g. the chat call failed; the live engine covers it
+    return {a["url"]: got[k] for a, k in zip(cards, keys) if got.get(k) and got[k] != _snippet_teaser(k[0], k[1])}
+
+@timed()
+def build_digests(kind: str, args, items):
+    tab, countries = ("global", digest_countries()) if kind == "global" else (args[0], [args[1]])
+    for country in countries:
+        cards = reorder_prioritize_local(items, country, n=2)[:60]  # what fetch_category / fetch_global serve
+        teasers = {level: _tease_cards(cards, level) for level in DIGEST_LEVELS}
+        body = zlib.compress(json.dumps({"cols": cards.cols, "teasers": teasers}).encode())
+        _store_db().execute("INSERT OR REPLACE INTO digests VALUES (?,?,?)", (f"{tab}:{country}", time.time(), body))
+
+@timed()
+@cache_data(ttl=60, show_spinner=False)
+def load_digest(tab: str, country: str, level: str):
+    """(cards, url → teaser) from the cohort's latest snapshot, or None if there is no recent one."""
+    if tab == "global": _job_touch("global", "global", [])
+    else: _job_touch(f"{tab}:{country}", "category", [tab, country])  # keeps the ingester publishing it
+    row = _store_db().execute("SELECT built_at, body FROM digests WHERE cohort=?", (f"{tab}:{country}",)).fetchone()
+    if row is None or time.time() - row[0] > DIGEST_MAX_AGE: return None
+    body = json.loads(zlib.decompress(row[1]))
+    if not body["cols"] or not body["cols"][0]: return None  # an empty snapshot: let the live path try
+    return _batch_from_columns(*body["cols"]), body["teasers"].get(level, {})
 
 def derive_persona(profile: dict) -> str:
     role = (profile.get("role") or "").lower()
     interests = ", ".join(profile.get("interests", []))
+    roles = ROLE_MATCHER.scan(role)
     hints = []
-    if any(k in role for k in ["student","mba","law","bba","llb"]):
+    if "student" in roles:
         hints.append("wants case-study angles, regulation, compliance and career-relevant examples")
-    if any(k in role for k in ["product","analyst","manager","strategy"]):
+    if "product" in roles:
         hints.append("cares about user impact, unit economics, KPI movement, operational risk")
-    if any(k in role for k in ["marketing","social","brand"]):
+    if "marketing" in roles:
         hints.append("cares about brand-safety, platform policy, targeting constraints, creative angles")
-    if any(k in role for k in ["finance","invest","bank","fintech"]):
+    if "finance" in roles:
         hints.append("cares about rates, liquidity, credit risk, regulatory changes")
-    if any(k in role for k in ["founder","startup"]):
+    if "founder" in roles:
         hints.append("cares about GTM, TAM, regulatory barriers, hiring, runway")
     if not hints: hints.append("prefers actionable, concrete insights")
     return f"User role: {profile.get('role','')}. Interests: {interests}. This user {', and '.join(hints)}."
@@ -425,10 +2263,10 @@ def derive_persona(profile: dict) -> str:
 def compute_context_hints(profile: dict, article: dict) -> list[str]:
     role = (profile.get("role") or "").lower()
     interests = [i.lower() for i in profile.get("interests", [])]
-    text = " ".join([article.get("title",""), article.get("desc",""), article.get("source","")]).lower()
+    tags = article_tags(article)
     hints = []
-    if any(k in text for k in ["employment","jobs","hiring","unemployment","payroll","labour","labor"]):
-        if any(k in role+str(interests) for k in ["mobility","road","safety","automotive","helmet","abs"]):
+    if "hint:employment" in tags:
+        if "mobility" in ROLE_MATCHER.scan(role+str(interests)):
             hints += [
                 "Employment ↑ → daily commuting ↑ → two-wheeler & rideshare usage ↑ → road exposure ↑",
                 "Road exposure ↑ → accident frequency/severity ↑ → demand for helmets/ABS/safety gear ↑",
@@ -437,25 +2275,25 @@ def compute_context_hints(profile: dict, article: dict) -> list[str]:
             "Employment ↑ → disposable income ↑ → F&B / leisure / quick-commerce spend ↑",
             "Employment ↑ → hiring pressure ↑ → wages ↑ → margin pressure unless pricing/productivity adjust"
         ]
-    if any(k in text for k in ["inflation","cpi","wpi","prices","rbi","repo","rate hike","policy rate"]):
+    if "hint:rates" in tags:
         hints += [
             "Rates ↑ → EMI ↑ → discretionary demand ↓; working capital cost ↑",
             "Edible oil/sugar/grains ↑ → F&B margin squeeze unless pricing/pack-size changes"
         ]
-    if any(k in text for k in ["election","regulation","regulatory","bill","parliament","supreme court"]):
+    if "hint:policy" in tags:
         hints += ["Policy uncertainty ↑ → ad-spend mix shifts; compliance updates; state-wise enforcement variance"]
-    if any(k in text for k in ["instagram","meta","youtube","tiktok","ads policy","brand safety","content moderation"]):
+    if "hint:platform" in tags:
         hints += ["Platform policy change → creative/targeting constraints → campaign refresh & brand-safety checks"]
-    if any(k in text for k in ["heatwave","flood","monsoon","climate","rainfall","el niño","la niña"]):
+    if "hint:weather" in tags:
         hints += ["Weather anomaly → footfall/logistics disruption; cold-chain stress; agri output variance"]
-    if any(k in text for k in ["fssai","food safety","hygiene","contamination","recall"]):
+    if "hint:food_safety" in tags:
         hints += ["Tighter standards → SOP audits & staff training → vendor QA and labeling compliance"]
     uniq = []
     for h in hints:
         if h not in uniq: uniq.append(h)
     return uniq[:6]
 
-def expand_summary(article, profile, level):
+def _expand_messages(article, profile, level):
     bounds = {"basic": (170,240), "normal": (160,220), "high": (230,320)}
     lo, hi = bounds.get(level, (160,220))
     persona = derive_persona(profile)
@@ -496,16 +2334,19 @@ def expand_summary(article, profile, level):
         "USER": {"name": profile.get("name"), "role": profile.get("role"), "interests": profile.get("interests", [])},
         "ARTICLE": {
             "title": article.get("title"), "source": article.get("source"),
-            "time": as_ist(article.get("published")), "snippet": article.get("desc"), "url": article.get("url")
+            "time": as_ist(article_ts(article)), "snippet": article.get("desc"), "url": article.get("url")
         },
         "DERIVED_CONTEXT_HINTS": context_hints,
         "PREFERENCES": {"recent_likes": liked, "recent_dislikes": disliked},
         "STYLE": style_line, "STRUCTURE": template
     }
-    messages = [{"role":"system","content":system}, {"role":"user","content":json.dumps(user)}]
-    return openai_chat(messages, temperature=0.23, model="gpt-4o-mini")
+    return [{"role":"system","content":system}, {"role":"user","content":json.dumps(user)}]
+
+def expand_summary(article, profile, level, stream=False):
+    chat = openai_chat_stream if stream else openai_chat
+    return chat(_expand_messages(article, profile, level), temperature=0.23, model="gpt-4o-mini", cache_ttl=EXPAND_TTL)
 
-def clarify(article, profile, level, question=None):
+def clarify(article, profile, level, question=None, stream=False):
     q = question or "Explain step-by-step HOW and WHY this news could affect me over the next 6–12 months."
     system = "Answer with a causal chain, tailored to the user's role/interests. Use ONLY provided article info."
     if level == "basic": system += " Use simple language; define jargon."
@@ -513,7 +2354,8 @@ def clarify(article, profile, level, question=None):
     user = {"QUESTION": q, "USER": {"role": profile["role"], "interests": profile["interests"]},
             "ARTICLE": {"title": article["title"], "snippet": article["desc"], "source": article["source"]}}
     msgs = [{"role":"system","content":system},{"role":"user","content":json.dumps(user)}]
-    return openai_chat(msgs, temperature=0.3)
+    chat = openai_chat_stream if stream else openai_chat
+    return chat(msgs, temperature=0.3, cache_ttl=EXPAND_TTL)
 
 # =========================
 # Styles (UI polish)
@@ -536,6 +2378,7 @@ st.markdown("""
 .chips { margin-top: 6px; }
 .chip { display: inline-block; padding: 2px 8px; border: 1px solid #e5e7eb; border-radius: 999px; font-size: 0.75rem; color: #374151; margin-right: 6px; }
 .teaser { color: #222; margin: 8px 0 10px 0; line-height: 1.5; }
+.teaser.pending { color: var(--muted); }
 .btnrow { margin-top: 6px; }
 a.btnlink { text-decoration: none; border: 1px solid #e5e7eb; padding: 6px 10px; border-radius: 8px; font-size: 0.85rem; }
 a.btnlink:hover { border-color: var(--accent); color: var(--accent); }
@@ -552,7 +2395,6 @@ def init_state():
     })
     st.session_state.setdefault("onboarded", False)
     st.session_state.setdefault("exclude_str", "celebrity,gossip,TMZ")
-init_state()
 
 def reading_preview(level: str):
     if level == "basic":
@@ -589,11 +2431,53 @@ def show_onboarding():
         st.session_state.onboarded = True
         st.rerun()
 
-def render_list(articles, profile, tab_name: str):
+TABS = {  # key → (label, name used in messages)
+    "foryou": ("✨ For You", "For You"), "tech": ("💻 Tech", "Tech"), "finance": ("💸 Finance", "Finance"),
+    "economy": ("📈 Economy", "Economy"), "health": ("🩺 Health & Wellness", "Health & Wellness"),
+    "global": ("🌍 Global", "Global"),
+}
+PAGE_SIZE = int(secret("PAGE_SIZE", 10))
+
+@timed()
+def load_tab(key: str, profile: dict):
+    """(cards, url → ready teaser) for a section."""
+    if key == "foryou":
+        prof_vec = build_profile_vector(profile).tolist() if embedder_ready() else None
+        liked = sorted({f["url"] for f in st.session_state.get("feedback", []) if f["label"] == +1})
+        return fetch_for_you(profile["interests"], profile["country"], profile_vec=prof_vec, liked=liked), {}
+    digest = load_digest(key, profile["country"], profile["reading_level"])
+    if digest is not None:
+        return digest
+    if key == "global":
+        return fetch_global(profile["country"]), {}
+    return fetch_category(key, profile["country"]), {}
+
+def _show_more(tab_name: str):
+    st.session_state[f"shown_{tab_name}"] += PAGE_SIZE
+
+@timed()
+def _show_similar(a):
+    st.session_state["similar_to"] = {k: a.get(k) for k in ("title", "url", "source", "desc", "alts")}
+    st.session_state.pop("shown_similar", None)
+
+@timed()
+def load_results(query: str):
+    """(cards, heading) for an open "more like this" or a search, else None for the normal section."""
+    if st.session_state.get("similar_to"):
+        a = st.session_state["similar_to"]
+        return more_like_this(a), f"More like: {a['title']}"
+    if query:
+        return semantic_search(query), f"Results for “{query}”"
+    return None
+
+def render_list(articles, profile, tab_name: str, teasers=None):
     if not articles:
-        st.info("No articles available right now. Try refreshing in a minute (the free NewsAPI tier can rate-limit).")
+        used, budget = newsapi_budget()
+        st.info("No articles available right now. Try refreshing in a minute"
+                + (" (today's NewsAPI budget is spent)." if used >= budget else " (the free NewsAPI tier can rate-limit)."))
         return
-    for idx, a in enumerate(articles):
+    shown = st.session_state.setdefault(f"shown_{tab_name}", PAGE_SIZE)
+    for idx, a in enumerate(articles[:shown]):
         base = f"{tab_name}_{idx}_{abs(hash(a['url']))}"
         btn_key      = f"btn_expand_{base}"
         content_key  = f"content_expand_{base}_{profile['reading_level']}"
@@ -605,34 +2489,45 @@ def render_list(articles, profile, tab_name: str):
         with st.container():
             st.markdown('<div class="card">', unsafe_allow_html=True)
             st.markdown(f'<div class="title">{a["title"]}</div>', unsafe_allow_html=True)
-            st.markdown(f'<div class="meta">{a["source"]} • {as_ist(a["published"])}</div>', unsafe_allow_html=True)
+            also = ", ".join(f'<a href="{x["url"]}" target="_blank">{x["source"]}</a>' for x in (a.get("alts") or [])[:4])
+            when = as_ist(article_ts(a))
+            st.markdown(f'<div class="meta">{a["source"]} • {when}{" • also in " + also if also else ""}</div>',
+                        unsafe_allow_html=True)
             st.markdown('<div class="chips"><span class="chip">Readable</span><span class="chip">Actionable</span></div>', unsafe_allow_html=True)
 
-            teaser = teaser_summary(a["title"], a.get("desc") or "", a["source"], profile["reading_level"], as_ist(a["published"]))
-            st.markdown(f'<div class="teaser">{teaser}</div>', unsafe_allow_html=True)
+            teaser_args = (a["title"], a.get("desc") or "", a["source"], profile["reading_level"], when)
+            teaser = (teasers or {}).get(a["url"]) or _teaser_get(teaser_args)  # cached: inline, no placeholder flicker
+            if teaser:
+                st.markdown(f'<div class="teaser">{teaser}</div>', unsafe_allow_html=True)
+            else:
+                queue_teaser(st.empty(), *teaser_args, priority=PRIO_VISIBLE if idx < ABOVE_FOLD else PRIO_OFFSCREEN)
 
-            c1, c2, _ = st.columns([1.2,1.2,2])
+            c1, c2, c3, _ = st.columns([1.2,1.2,1.2,0.8])
             with c1:
-                if st.button("🔍 Expand analysis", key=btn_key):
-                    with st.spinner("Personalizing…"):
-                        st.session_state[content_key] = expand_summary(a, profile, profile["reading_level"])
+                expand_clicked = st.button("🔍 Expand analysis", key=btn_key)
             with c2:
                 st.markdown(f'<a class="btnlink" href="{a["url"]}" target="_blank">↗ Read original</a>', unsafe_allow_html=True)
+            with c3:
+                st.button("🧭 More like this", key=f"similar_{base}", on_click=_show_similar, args=(a,))
 
-            if st.session_state[content_key]:
+            if expand_clicked:  # stream full-width under the card; the text is kept for later reruns
+                st.markdown("<hr class='sep'/>", unsafe_allow_html=True)
+                st.session_state[content_key] = st.write_stream(expand_summary(a, profile, profile["reading_level"], stream=True))
+            elif st.session_state[content_key]:
                 st.markdown("<hr class='sep'/>", unsafe_allow_html=True)
                 st.markdown(st.session_state[content_key])
+
+            if st.session_state[content_key]:
                 with st.expander("How? Why? Ask for a causal explanation", expanded=False):
                     q = st.text_input("Ask a question (optional):", key=clarify_qkey, value="")
                     if st.button("Answer", key=clarify_btn):
-                        with st.spinner("Thinking…"):
-                            ans = clarify(a, profile, profile["reading_level"], question=q or None)
-                            st.write(ans)
+                        st.write_stream(clarify(a, profile, profile["reading_level"], question=q or None, stream=True))
 
                 c_like, c_dislike, c_save = st.columns([1,1,1])
                 with c_like:
                     if st.button("👍 Useful", key=f"like_{base}"):
-                        remember_feedback(a["url"], a["title"], +1); st.success("Noted")
+                        remember_feedback(a["url"], a["title"], +1, text=embed_text_of(a))
+                        st.success("Noted")
                 with c_dislike:
                     if st.button("👎 Not for me", key=f"dislike_{base}"):
                         remember_feedback(a["url"], a["title"], -1); st.info("We’ll show fewer like this")
@@ -642,88 +2537,105 @@ def render_list(articles, profile, tab_name: str):
 
             st.markdown("</div>", unsafe_allow_html=True)
 
+    if len(articles) > shown:
+        st.button(f"Load more ({len(articles) - shown} left)", key=f"more_{tab_name}",
+                  on_click=_show_more, args=(tab_name,))
+
+def render_dev_panel():
+    """Sidebar waterfall of this rerun's spans, plus the process's cache and upstream counters."""
+    total = time.perf_counter() - TRACE["t0"]
+    spans = sorted(TRACE["spans"], key=lambda s: -s[2])[:60]  # the slowest; fast ones are just noise
+    rows = []
+    for name, start, dt, thread, depth in sorted(spans, key=lambda s: s[1]):
+        left, width = 100 * start / total, max(0.5, 100 * dt / total)
+        color = "#2f6feb" if thread == "MainThread" or thread.startswith("ScriptRunner") else "#d29922"
+        rows.append(f'<div style="display:flex;align-items:center;font-size:11px;line-height:14px" title="{thread}">'
+                    f'<span style="width:42%;padding-left:{6*depth}px;overflow:hidden;white-space:nowrap">{name}</span>'
+                    f'<span style="flex:1;position:relative;height:10px;background:#f0f2f6">'
+                    f'<span style="position:absolute;left:{left:.1f}%;width:{width:.1f}%;height:10px;background:{color}"></span>'
+                    f'</span><span style="width:52px;text-align:right">{1000*dt:.0f} ms</span></div>')
+    with st.sidebar.expander(f"⏱ This rerun: {1000*total:.0f} ms, {len(TRACE['spans'])} spans", expanded=True):
+        st.markdown("".join(rows) or "No spans yet.", unsafe_allow_html=True)
+        st.caption("Blue: script thread • amber: fetch / teaser workers. Process totals:")
+        counters = metrics().snapshot()["counters"]
+        st.dataframe(counters, hide_index=True, use_container_width=True)
+
 # =========================
 # MAIN
 # =========================
-if not st.session_state.onboarded:
-    show_onboarding()
-    st.stop()
-
-with st.sidebar:
-    st.header("Your profile")
-    p = st.session_state.profile
-    p["name"] = st.text_input("Name", value=p["name"])
-    p["role"] = st.text_input("Work/Study", value=p["role"])
-    p["country"] = st.selectbox("Local preference (country)", ["in","us","gb","sg","au","ca"],
-                                index=["in","us","gb","sg","au","ca"].index(p["country"]))
-    interests_str = st.text_area("Interests (comma separated)", value=", ".join(p["interests"]), height=90)
-    p["interests"] = [i.strip() for i in interests_str.split(",") if i.strip()]
-
-    old_level = p["reading_level"]
-    p["reading_level"] = st.radio("Reading level", ["basic","normal","high"],
-                                  index=["basic","normal","high"].index(p["reading_level"]), horizontal=True)
-    if p["reading_level"] != old_level: clear_expanded_summaries()
-    st.caption("Change level → teasers + expansions adapt to the new level.")
-
-    exclude_str = st.text_input("Exclude topics (comma separated)",
-                                value=st.session_state.get("exclude_str", "celebrity,gossip,TMZ"))
-    st.session_state["exclude_str"] = exclude_str
-    EXCLUDE_KWS = [w.strip().lower() for w in exclude_str.split(",") if w.strip()]
-
-    st.session_state.profile = p
-
-st.markdown('<div class="header-title">🗞️ Your personalized briefing</div>', unsafe_allow_html=True)
-st.markdown('<div class="header-sub">Depth on demand • Local-first • Actionable next steps</div>', unsafe_allow_html=True)
-
-tabs = st.tabs(["✨ For You", "💻 Tech", "💸 Finance", "📈 Economy", "🩺 Health & Wellness", "🌍 Global"])
-
-with tabs[0]:
-    try:
-        prof_vec = build_profile_vector(st.session_state.profile)
-        data = fetch_for_you(st.session_state.profile["interests"], st.session_state.profile["country"], profile_vec=prof_vec)
-        data = apply_exclusions(data, EXCLUDE_KWS)
-        render_list(data, st.session_state.profile, tab_name="foryou")
-    except Exception as e:
-        st.error(f"Failed to load For You: {e}")
-
-with tabs[1]:
-    try:
-        data = fetch_category("tech", st.session_state.profile["country"])
-        data = apply_exclusions(data, EXCLUDE_KWS)
-        render_list(data, st.session_state.profile, tab_name="tech")
-    except Exception as e:
-        st.error(f"Failed to load Tech: {e}")
-
-with tabs[2]:
-    try:
-        data = fetch_category("finance", st.session_state.profile["country"])
-        data = apply_exclusions(data, EXCLUDE_KWS)
-        render_list(data, st.session_state.profile, tab_name="finance")
-    except Exception as e:
-        st.error(f"Failed to load Finance: {e}")
-
-with tabs[3]:
-    try:
-        data = fetch_category("economy", st.session_state.profile["country"])
-        data = apply_exclusions(data, EXCLUDE_KWS)
-        render_list(data, st.session_state.profile, tab_name="economy")
-    except Exception as e:
-        st.error(f"Failed to load Economy: {e}")
+def main():
+    init_memory()
+    init_state()
+    embedder()  # starts the model warm-up on the first run in this process
+    if INGEST_DAEMON: start_ingest_daemon()
+    if METRICS_PORT: metrics_server()
+
+    if not st.session_state.onboarded:
+        show_onboarding()
+        return
 
-with tabs[4]:
+    with st.sidebar:
+        st.header("Your profile")
+        p = st.session_state.profile
+        p["name"] = st.text_input("Name", value=p["name"])
+        p["role"] = st.text_input("Work/Study", value=p["role"])
+        p["country"] = st.selectbox("Local preference (country)", ["in","us","gb","sg","au","ca"],
+                                    index=["in","us","gb","sg","au","ca"].index(p["country"]))
+        interests_str = st.text_area("Interests (comma separated)", value=", ".join(p["interests"]), height=90)
+        p["interests"] = [i.strip() for i in interests_str.split(",") if i.strip()]
+
+        old_level = p["reading_level"]
+        p["reading_level"] = st.radio("Reading level", ["basic","normal","high"],
+                                      index=["basic","normal","high"].index(p["reading_level"]), horizontal=True)
+        if p["reading_level"] != old_level: clear_expanded_summaries()
+        st.caption("Change level → teasers + expansions adapt to the new level.")
+
+        exclude_str = st.text_input("Exclude topics (comma separated)",
+                                    value=st.session_state.get("exclude_str", "celebrity,gossip,TMZ"))
+        st.session_state["exclude_str"] = exclude_str
+        EXCLUDE_KWS = [w.strip().lower() for w in exclude_str.split(",") if w.strip()]
+
+        st.session_state.profile = p
+        fingerprint = text_hash(json.dumps(p, sort_keys=True))
+        if st.session_state.setdefault("profile_fp", fingerprint) != fingerprint:
+            st.session_state["profile_fp"] = fingerprint
+            cancel_speculative_llm()
+        if not embedder_ready():
+            st.caption("Semantic ranking is warming up; For You is ranked by your interests for now.")
+
+    st.markdown('<div class="header-title">🗞️ Your personalized briefing</div>', unsafe_allow_html=True)
+    st.markdown('<div class="header-sub">Depth on demand • Local-first • Actionable next steps</div>', unsafe_allow_html=True)
+
+    # Only the active section is fetched and rendered (st.tabs would run all six bodies on every rerun)
+    close_similar = lambda: st.session_state.pop("similar_to", None)
+    active = st.radio("Section", list(TABS), format_func=lambda k: TABS[k][0], horizontal=True,
+                      key="active_tab", label_visibility="collapsed", on_change=close_similar)
+    query = st.text_input("Search", key="search_q", placeholder="🔎 Search every article ingested so far…",
+                          label_visibility="collapsed", on_change=close_similar).strip()
+    data, results = [], None
     try:
-        data = fetch_category("health", st.session_state.profile["country"])
-        data = apply_exclusions(data, EXCLUDE_KWS)
-        render_list(data, st.session_state.profile, tab_name="health")
+        results = load_results(query)
+        if results is not None:  # search / more like this: local index only, no NewsAPI
+            data, heading = results
+            st.markdown(f"**{heading}**")
+            if st.session_state.get("similar_to"):
+                st.button("✕ Back", key="similar_back", on_click=close_similar)
+            data = apply_exclusions(data, EXCLUDE_KWS)
+            if data: render_list(data, st.session_state.profile, tab_name="similar" if st.session_state.get("similar_to") else "search")
+            else: st.info("Nothing in the local index matches yet; it grows with every refresh.")
+        else:
+            data, teasers = load_tab(active, st.session_state.profile)
+            data = apply_exclusions(data, EXCLUDE_KWS)
+            render_list(data, st.session_state.profile, tab_name=active, teasers=teasers)
     except Exception as e:
-        st.error(f"Failed to load Health & Wellness: {e}")
+        st.error(f"Failed to load {TABS[active][1]}: {e}")
 
-with tabs[5]:
-    try:
-        data = fetch_global(st.session_state.profile["country"])
-        data = apply_exclusions(data, EXCLUDE_KWS)
-        render_list(data, st.session_state.profile, tab_name="global")
-    except Exception as e:
-        st.error(f"Failed to load Global: {e}")
+    flush_teasers()
+    if active == "foryou" and results is None and OPENAI_API_KEY: prefetch_expansions(data, st.session_state.profile)
+    st.caption(f"Generated at {datetime.now(IST).strftime('%d %b %Y, %H:%M IST')} • MVP demo")
+    if DEV_PANEL or st.query_params.get("dev") == "1": render_dev_panel()
 
-st.caption(f"Generated at {datetime.now(IST).strftime('%d %b %Y, %H:%M IST')} • MVP demo")
+if get_script_run_ctx(suppress_warning=True) is not None:
+    main()  # `streamlit run app.py`
+elif __name__ == "__main__":
+    ingest_forever()  # bare `python app.py`: headless ingestion service
@@ -0,0 +1,148 @@
+"""Throughput / memory benchmark for app.py's article pipeline on synthetic NewsAPI + RSS payloads.
+
+    python bench.py                              # 60, 1k, 10k and 100k articles
+    python bench.py --sizes 60,1000 --update-baseline
+    python bench.py --baseline bench_baseline.json --tolerance 0.25
+
+Each stage (shape, apply_exclusions, reorder_prioritize_local, For You ranking with keyword and embedding
+scores, compute_context_hints, render_list) reports ops/s (calls/s, best of the timed runs), the first call
+with cold per-process caches, and peak traced memory / net allocated blocks of one call under tracemalloc.
+app.py is imported through headless.py and payloads come from standin.py's generator; no upstream is
+contacted: embeddings are stubbed with deterministic random unit vectors. With a baseline file, stages that
+got slower or bigger than --tolerance are listed and the exit status is 1.
+"""
+import argparse, gc, json, os, random, sys, time, tracemalloc
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+import numpy as np
+
+import standin
+from headless import app
+
+SOURCES = sorted(app.MAJOR) + ["Blog Daily", "Local Wire", "Tech Digest", "Market Watchers"]
+DOMAINS = [d for ds in app.LOCAL_DOMAINS.values() for d in ds] + ["example.com", "news.example.org"]
+PROFILE = {"name": "Bench", "role": "finance analyst at a mobility startup", "interests": ["rbi", "startups", "ai"],
+           "reading_level": "normal", "country": "in"}
+EXCLUDE = ["celebrity", "gossip", "tmz"]
+DIM = 384  # all-MiniLM-L6-v2
+
+# =========================
+# Synthetic payloads
+# =========================
+def synthetic(n: int, seed: int = 0) -> list[dict]:
+    """n raw articles from standin's NewsAPI generator (titles mention the profile's interests or an excluded
+    word, every 7th is a near-duplicate from another outlet), spread over local and other domains and ~40%
+    re-shaped as RSS items."""
+    rnd, out = random.Random(seed), []
+    for a in standin.articles(f"bench-{seed}", PROFILE["interests"] + EXCLUDE, n, datetime.now(timezone.utc)):
+        url = f"https://{rnd.choice(DOMAINS)}/{a['url'].split('/', 3)[3]}"
+        source = rnd.choice(SOURCES)
+        if rnd.random() < 0.6:
+            out.append({**a, "url": url, "source": {"id": None, "name": source}})
+        else:
+            when = datetime.strptime(a["publishedAt"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+            out.append({"title": a["title"], "url": url, "source": source, "published": format_datetime(when),
+                        "image": None, "desc": a["description"]})
+    return out
+
+def stub_embeddings(items) -> dict:
+    """text → unit vector for every article, so ranking never reaches a model or OpenAI."""
+    rng = np.random.default_rng(0)
+    texts = [t + " " + (d or "") for t, d in zip(items.column("title"), items.column("desc"))]
+    vecs = rng.standard_normal((len(texts), DIM)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return dict(zip(texts, vecs))
+
+# =========================
+# Measurement
+# =========================
+def clear_process_caches():
+    for key, value in list(app._PROCESS.resources.items()):
+        if key[0] == "lru": value.cache_clear()
+
+def measure(fn, min_time: float, max_runs: int) -> dict:
+    clear_process_caches()
+    t = time.perf_counter(); fn(); cold = time.perf_counter() - t
+    runs, spent = [], 0.0
+    while spent < min_time and len(runs) < max_runs:
+        t = time.perf_counter(); fn(); dt = time.perf_counter() - t
+        runs.append(dt); spent += dt
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    net_blocks = sys.getallocatedblocks() - blocks
+    del result
+    best = min(runs)
+    return {"ops_s": 1 / best if best else float("inf"), "best_ms": 1000 * best, "cold_ms": 1000 * cold,
+            "runs": len(runs), "peak_kb": peak / 1024, "net_blocks": net_blocks}
+
+def stages(raw: list[dict]) -> dict:
+    shaped = app.shape(raw)
+    vectors = stub_embeddings(shaped)
+    app.embed_texts = lambda texts: np.stack([vectors[t] for t in texts])
+    terms = app.for_you_terms(PROFILE["interests"])
+    profile_vec = [next(iter(vectors.values())).tolist()] if vectors else None
+    app.init_memory()
+    def render():
+        app.render_list(shaped, PROFILE, "bench")
+        app.TEASER_JOBS.clear()  # queued, never flushed: teasers are LLM work, not rendering
+    return {
+        "shape": lambda: app.shape(raw),
+        "apply_exclusions": lambda: app.apply_exclusions(shaped, EXCLUDE),
+        "reorder_prioritize_local": lambda: app.reorder_prioritize_local(shaped, PROFILE["country"]),
+        "rank_for_you[keywords]": lambda: app.rank_for_you(shaped, terms, PROFILE["country"]),
+        "rank_for_you[embeddings]": lambda: app.rank_for_you(shaped, terms, PROFILE["country"], profile_vec),
+        "compute_context_hints": lambda: [app.compute_context_hints(PROFILE, a) for a in shaped],
+        "render_list": render,
+    }
+
+# =========================
+# Baseline comparison
+# =========================
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    worse = []
+    for key, r in results.items():
+        b = baseline.get(key)
+        if not b: continue
+        if r["ops_s"] < b["ops_s"] / (1 + tolerance):
+            worse.append(f"{key}: {r['ops_s']:.1f} ops/s vs {b['ops_s']:.1f} baseline")
+        if r["peak_kb"] > b["peak_kb"] * (1 + tolerance) + 64:  # +64 KiB so tiny stages don't flap
+            worse.append(f"{key}: peak {r['peak_kb']:.0f} KiB vs {b['peak_kb']:.0f} baseline")
+    return worse
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--sizes", default="60,1000,10000,100000")
+    ap.add_argument("--min-time", type=float, default=0.5, help="seconds of timed runs per stage")
+    ap.add_argument("--max-runs", type=int, default=200)
+    ap.add_argument("--baseline", default="bench_baseline.json")
+    ap.add_argument("--update-baseline", action="store_true", help="write this run as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown / memory growth vs baseline")
+    ap.add_argument("--json", help="also write the results here")
+    a = ap.parse_args()
+
+    results = {}
+    print(f"{'stage':<28}{'n':>8}{'ops/s':>12}{'best ms':>10}{'cold ms':>10}{'peak KiB':>11}{'blocks':>10}")
+    for n in (int(x) for x in a.sizes.split(",")):
+        for name, fn in stages(synthetic(n)).items():
+            r = results[f"{name}@{n}"] = measure(fn, a.min_time, a.max_runs)
+            print(f"{name:<28}{n:>8}{r['ops_s']:>12.1f}{r['best_ms']:>10.2f}{r['cold_ms']:>10.2f}"
+                  f"{r['peak_kb']:>11.0f}{r['net_blocks']:>10}")
+    if a.json:
+        with open(a.json, "w") as f: json.dump(results, f, indent=1)
+    if a.update_baseline:
+        with open(a.baseline, "w") as f: json.dump(results, f, indent=1)
+        print(f"baseline written to {a.baseline}")
+        return 0
+    if os.path.exists(a.baseline):
+        with open(a.baseline) as f: worse = compare(results, json.load(f), a.tolerance)
+        print("\n".join(["regressions:"] + worse) if worse else f"no regressions vs {a.baseline}")
+        return 1 if worse else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""Behaviour checks for app.py's hand-rolled algorithms, re-runnable after changing them.
+
+    python checks.py                 # all checks
+    python checks.py keyword_matcher --seed 3
+
+Each check compares a fast path against a plain reference (or asserts the properties it promises) on
+seeded random inputs and prints PASS/FAIL; the exit status is 1 if any failed. app.py is imported through
+headless.py (throwaway CACHE_DIR), and nothing contacts an upstream.
+"""
+import argparse, contextlib, functools, random, sys, threading, time, traceback, types
+
+import numpy as np
+
+from headless import app
+
+CHECKS = {}
+
+def check(fn):
+    CHECKS[fn.__name__] = fn
+    return fn
+
+# =========================
+# KeywordMatcher: one trie regex == per-group substring scans
+# =========================
+@check
+def keyword_matcher(rnd: random.Random, cases: int = 20000):
+    alphabet = "abc d"  # tiny, so keywords overlap, nest and repeat a lot
+    word = lambda lo, hi: "".join(rnd.choice(alphabet) for _ in range(rnd.randint(lo, hi))).strip()
+    for case in range(cases):
+        groups = {f"g{i}": [w for w in (word(1, 4) for _ in range(rnd.randint(0, 4))) if w] for i in range(rnd.randint(1, 4))}
+        text = word(0, 30).lower()
+        m = app.KeywordMatcher(groups)
+        want = frozenset(g for g, ws in groups.items() if any(w.lower() in text for w in ws))
+        assert m.scan(text) == want, f"case {case}: {groups} on {text!r}: {set(m.scan(text))} != {set(want)}"
+        assert m.any(text) == bool(want), f"case {case}: any() disagrees with scan() for {groups} on {text!r}"
+
+# =========================
+# Near-duplicate clustering: MinHash + LSH merges pairs above DUP_JACCARD, keeps distinct stories apart
+# =========================
+@check
+def near_duplicates(rnd: random.Random, trials: int = 600):
+    vocab = [f"w{i:03d}" for i in range(800)]
+    sentence = lambda n: [rnd.choice(vocab) for _ in range(n)]
+    def article(title, desc, i):
+        return app.Article(" ".join(title), f"https://outlet{i}.example/{rnd.random()}", f"Outlet {i}", desc=" ".join(desc))
+    def jaccard(x, y):
+        sx, sy = set(app._shingles(x).tolist()), set(app._shingles(y).tolist())
+        return len(sx & sy) / len(sx | sy)
+    high = low = merged_high = merged_low = 0
+    for _ in range(trials):
+        title, desc = sentence(10), sentence(25)
+        rewrite = rnd.random()  # share of words another outlet changed: 0 → wire copy, 1 → a different story
+        t2, d2 = ([w if rnd.random() >= rewrite else rnd.choice(vocab) for w in ws] for ws in (title, desc))
+        a, b = article(title, desc, 1), article(t2, d2, 2)
+        j, merged = jaccard(a, b), len(app.cluster_near_duplicates([a, b])) == 1
+        if j >= 0.7: high, merged_high = high + 1, merged_high + merged
+        if j <= 0.2: low, merged_low = low + 1, merged_low + merged
+    unrelated = sum(len(app.cluster_near_duplicates([article(sentence(10), sentence(25), 1),
+                                                     article(sentence(10), sentence(25), 2)])) == 1 for _ in range(trials))
+    assert high and merged_high / high >= 0.95, f"only {merged_high}/{high} pairs with Jaccard ≥ 0.7 merged"
+    assert not low or merged_low / low <= 0.02, f"{merged_low}/{low} pairs with Jaccard ≤ 0.2 merged"
+    assert unrelated == 0, f"{unrelated}/{trials} unrelated pairs merged"
+    # the better-scored (first) item stays the card; the other becomes one of its alternates
+    a = article(sentence(10), sentence(25), 1)
+    b = app.Article(a.title, "https://other.example/x", "Other", desc=a.desc)
+    out = app.cluster_near_duplicates([a, b])
+    assert out == [a] and a.alts == [{"source": "Other", "url": "https://other.example/x"}], a.alts
+
+# =========================
+# LlmScheduler: priority order, shared runs for one key, per-session cancel and token budget
+# =========================
+@contextlib.contextmanager
+def as_session(session_id):
+    """Submit as if from that session's script thread (the scheduler reads its ScriptRunContext)."""
+    thread = threading.current_thread()
+    setattr(thread, app.SCRIPT_RUN_CONTEXT_ATTR_NAME, types.SimpleNamespace(session_id=session_id))
+    try: yield
+    finally: setattr(thread, app.SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+
+@check
+def llm_scheduler(rnd: random.Random, jobs: int = 40):
+    concurrency, app.LLM_CONCURRENCY = app.LLM_CONCURRENCY, 1  # one worker, so the run order is the heap order
+    try: s = app.LlmScheduler()
+    finally: app.LLM_CONCURRENCY = concurrency
+    gate, ran = threading.Event(), []
+    held = s.submit(gate.wait, app.PRIO_VISIBLE)  # occupies the worker while the rest queue up
+    time.sleep(0.05)
+    # lowest priority first, FIFO within one
+    prios = [rnd.choice((app.PRIO_VISIBLE, app.PRIO_OFFSCREEN, app.PRIO_SPECULATIVE, app.PRIO_BACKGROUND)) for _ in range(jobs)]
+    futs = [s.submit(functools.partial(ran.append, (p, i)), p) for i, p in enumerate(prios)]
+    # one key queued twice runs once, both callers get its future
+    calls = []
+    first = s.submit(lambda: calls.append(1) or "once", app.PRIO_OFFSCREEN, key=("teaser", "u1"))
+    assert s.submit(lambda: calls.append(2) or "twice", app.PRIO_OFFSCREEN, key=("teaser", "u1")) is first
+    # cancel drops only that session's queued jobs at min_priority and below
+    with as_session("s1"):
+        mine = {p: s.submit(lambda p=p: ran.append(("s1", p)), p, key=("s1", p)) for p in range(4)}
+    with as_session("s2"):
+        theirs = s.submit(lambda: ran.append(("s2", 2)), app.PRIO_SPECULATIVE)
+    assert s.cancel("s1", min_priority=app.PRIO_OFFSCREEN) == 3
+    assert [p for p, f in mine.items() if f.cancelled()] == [1, 2, 3] and not theirs.cancelled()
+    assert set(s.pending) == {("teaser", "u1"), ("s1", 0)}, s.pending
+    # a cancelled future is never handed out again: the same key queues a fresh run
+    again = s.submit(lambda: "fresh", app.PRIO_SPECULATIVE, key=("s1", 2))
+    assert again is not mine[2] and not again.cancelled()
+    # ...also when the caller cancelled it itself and it is still in the heap; dropping that stale
+    # entry later must not unlink the replacement, or a third submit would run the key twice
+    with as_session("s3"):
+        stale = s.submit(lambda: "stale", app.PRIO_SPECULATIVE, key=("s3", "k"))
+    stale.cancel()
+    with as_session("s3"):
+        fresh = s.submit(lambda: "fresh", app.PRIO_VISIBLE, key=("s3", "k"))
+    assert fresh is not stale and s.pending[("s3", "k")] is fresh
+    assert s.cancel("s3", min_priority=app.PRIO_SPECULATIVE) == 1
+    assert s.submit(lambda: "dup", app.PRIO_VISIBLE, key=("s3", "k")) is fresh
+    # a more urgent submit of a queued key moves it up: the visible card doesn't wait behind speculative work
+    digest = s.submit(lambda: ran.append(("teaser", "digest")), app.PRIO_BACKGROUND, key=("teaser", "chunk"))
+    spec = [s.submit(functools.partial(ran.append, ("spec", i)), app.PRIO_SPECULATIVE) for i in range(3)]
+    assert s.submit(lambda: ran.append(("teaser", "visible")), app.PRIO_VISIBLE, key=("teaser", "chunk")) is digest
+    # sessions withdraw only themselves from a shared job; it's dropped when its last waiter goes
+    with as_session("B"):
+        b_fut = s.submit(lambda: ran.append(("shared", "B")), app.PRIO_OFFSCREEN, key=("teaser", "bc"))
+    with as_session("C"):
+        assert s.submit(lambda: "C", app.PRIO_VISIBLE, key=("teaser", "bc")) is b_fut
+        assert s.release([b_fut]) == 0 and not b_fut.cancelled(), "C's rerun cancelled the chunk B waits on"
+    assert s.queued[b_fut][0] == app.PRIO_OFFSCREEN, "C's urgency outlived C"
+    with as_session("B"):
+        alone = s.submit(lambda: "B alone", app.PRIO_SPECULATIVE, key=("teaser", "b"))
+        assert s.release([alone]) == 1 and alone.cancelled() and ("teaser", "b") not in s.pending
+    ingest = s.submit(lambda: ran.append(("shared", "ingest")), app.PRIO_BACKGROUND, key=("teaser", "digest2"))
+    with as_session("D"):
+        assert s.submit(lambda: "D", app.PRIO_VISIBLE, key=("teaser", "digest2")) is ingest
+        assert s.cancel("D") == 0 and not ingest.cancelled(), "a session's cancel dropped the digest builder's chunk"
+    gate.set()
+    for f in [held, *futs, digest, *spec, b_fut, ingest]: f.result(timeout=5)
+    assert ran.index(("teaser", "digest")) < ran.index(("spec", 0)) and ("teaser", "visible") not in ran, ran
+    assert first.result(timeout=5) == "once" and calls == [1]
+    assert fresh.result(timeout=5) == "fresh" and again.result(timeout=5) == "fresh"
+    assert theirs.result(timeout=5) is None and mine[0].result(timeout=5) is None
+    order = [job for job in ran if isinstance(job[0], int)]
+    assert order == sorted(order), f"ran out of priority order: {order}"
+    assert ("s1", 0) in ran and ("s2", 2) in ran and not {("s1", 1), ("s1", 2), ("s1", 3)} & set(ran), ran
+    time.sleep(0.05)
+    assert not s.pending, s.pending
+    # past LLM_SESSION_TOKENS a session's jobs fail fast; other sessions and the ingester (no session) still run
+    s.charge("s1", app.LLM_SESSION_TOKENS)
+    with as_session("s1"):
+        spent = s.submit(lambda: "spent", app.PRIO_VISIBLE)
+    with as_session("s2"):
+        other = s.submit(lambda: "other", app.PRIO_VISIBLE)
+    assert isinstance(spent.exception(timeout=5), app.LlmBudgetExceeded)
+    assert other.result(timeout=5) == "other" and s.submit(lambda: "ingest", app.PRIO_BACKGROUND).result(timeout=5) == "ingest"
+
+# =========================
+# AnnIndex: IVF search ≈ brute force over live entries; expired ones leave, new ones are picked up
+# =========================
+def ann_fill(model, vecs, ts, start=0):
+    """Store the vectors and register them as ann_entries u<start>, u<start+1>, … the way ann_add does."""
+    hashes = [f"{model}-{start + i}" for i in range(len(vecs))]
+    app.embedding_store(model).put(hashes, vecs)
+    app._ann_db().executemany("INSERT INTO ann_entries (model, hash, url, ts) VALUES (?,?,?,?)",
+                              [(model, h, f"u{start + i}", t) for i, (h, t) in enumerate(zip(hashes, ts))])
+    return [f"u{start + i}" for i in range(len(vecs))]
+
+@check
+def ann_index(rnd: random.Random, n: int = 6000, dim: int = 32, queries: int = 50, k: int = 10):
+    rng = np.random.default_rng(rnd.randrange(1 << 32))
+    unit = lambda x: (x / np.linalg.norm(x, axis=-1, keepdims=True)).astype(np.float32)
+    centers = unit(rng.standard_normal((60, dim)))
+    X = unit(centers[rng.integers(0, 60, n)] + 0.2 * rng.standard_normal((n, dim)))  # overlapping, so NPROBE matters
+    now = time.time()
+    expired = rng.random(n) < 0.1
+    ts = np.where(expired, now - (app.ANN_MAX_AGE_DAYS + 10) * 86400, now - rng.uniform(0, 5 * 86400, n))
+    urls = np.array(ann_fill("check-ivf", X, ts.tolist()))
+    idx = app.AnnIndex("check-ivf")
+    Q = unit(centers[rng.integers(0, 60, queries)] + 0.2 * rng.standard_normal((queries, dim)))
+    hits = 0
+    for q in Q:
+        got = idx.search(q, k)
+        assert idx.centroids is not None, "index never trained"
+        scores = np.where(expired, -np.inf, X @ q)
+        want = set(urls[np.argsort(-scores)[:k]])
+        assert not {u for u, _ in got} & set(urls[expired]), "an expired entry came back"
+        assert [s for _, s in got] == sorted((s for _, s in got), reverse=True), "results out of order"
+        hits += len(want & {u for u, _ in got})
+    assert hits / (k * queries) >= 0.9, f"recall@{k} {hits / (k * queries):.3f} < 0.9"
+    assert len(idx.rows) == (~expired).sum(), "training kept expired entries"
+    # a query sitting exactly on an expired vector still doesn't return it
+    gone = int(np.flatnonzero(expired)[0])
+    assert urls[gone] not in {u for u, _ in idx.search(X[gone], k)}
+    # exclude and min_ts filter before the top k is cut
+    first = idx.search(Q[0], k)
+    skip = {u for u, _ in first[:3]}
+    again = idx.search(Q[0], k, exclude=skip)
+    assert len(again) == k and not skip & {u for u, _ in again}
+    recent = now - 86400
+    fresh = {u for u, t in zip(urls, ts) if t >= recent}
+    assert {u for u, _ in idx.search(Q[0], k, min_ts=recent)} <= fresh
+    # entries another process appends after training are found by the next search
+    added = ann_fill("check-ivf", unit(centers[7] + 0.01 * rng.standard_normal((5, dim))), [now] * 5, start=n)
+    assert set(added) <= {u for u, _ in idx.search(centers[7], k)}, "entries added after the first search are missing"
+    # ...but ones already past ANN_MAX_AGE_DAYS when they arrive (no retrain to drop them) are filtered at query time
+    stale = ann_fill("check-ivf", unit(centers[9] + 0.01 * rng.standard_normal((5, dim))),
+                     [now - (app.ANN_MAX_AGE_DAYS + 1) * 86400] * 5, start=n + 5)
+    assert not set(stale) & {u for u, _ in idx.search(centers[9], k)}, "an entry that expired after training came back"
+    # below ANN_TRAIN_MIN the index is a flat scan, so it is exact
+    small = app.AnnIndex("check-flat")
+    Y = unit(rng.standard_normal((300, dim)))
+    ys = np.array(ann_fill("check-flat", Y, [now] * 300))
+    for q in Q[:10]:
+        assert [u for u, _ in small.search(q, k)] == list(ys[np.argsort(-(Y @ q), kind="stable")[:k]])
+    assert small.centroids is None
+    # compacting the store down to the indexed hashes keeps their vectors; the index follows the new rows
+    store = app.embedding_store("check-ivf")
+    app._ann_db().execute("DELETE FROM ann_entries WHERE model='check-ivf' AND ts < ?",
+                          (now - app.ANN_MAX_AGE_DAYS * 86400,))
+    keep = {h for (h,) in app._ann_db().execute("SELECT hash FROM ann_entries WHERE model='check-ivf'")}
+    vecs = store.get(sorted(keep))
+    gen, dropped = store.generation(), store.compact(keep)
+    assert dropped and store.count() == len(keep) and store.generation() == gen + 1
+    assert all(np.array_equal(v, vecs[h]) for h, v in store.get(sorted(keep)).items()), "compaction moved vectors"
+    by_url = dict(zip(urls, X))
+    for q in Q[:10]:
+        got = idx.search(q, k)
+        assert len(got) == k and all(abs(s - by_url[u] @ q) < 1e-5 for u, s in got if u in by_url), \
+            "the index didn't follow the compacted rows"
+    later = ann_fill("check-ivf", unit(centers[11] + 0.01 * rng.standard_normal((3, dim))), [now] * 3, start=n + 10)
+    assert set(later) <= {u for u, _ in idx.search(centers[11], k)}, "a put after compaction went to the old file"
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("names", nargs="*", help=f"checks to run (default: all of {', '.join(CHECKS)})")
+    ap.add_argument("--seed", type=int, default=0)
+    a = ap.parse_args()
+    failed = 0
+    for name in a.names or CHECKS:
+        t = time.perf_counter()
+        try:
+            CHECKS[name](random.Random(a.seed))
+            print(f"PASS {name} ({time.perf_counter() - t:.1f}s)")
+        except Exception:
+            failed += 1
+            print(f"FAIL {name}\n{traceback.format_exc()}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Local embedding service for app.py: one SBERT encoder shared by every Streamlit session and process.
+
+    python embed_worker.py --socket /tmp/newsagent-embed.sock --procs 2
+
+then set EMBED_WORKER_SOCKET to the same path in the app's secrets. Requests from all clients that arrive
+within --window-ms are merged (and de-duplicated) into one micro-batch, split across --procs encoder
+processes, so throughput scales with cores instead of each session encoding a few titles under the GIL.
+
+Protocol (one request per connection): the client sends a JSON line {"texts": [...]} (or {"op": "ping"});
+the worker answers with a JSON line {"n": n, "dim": d, "model": ...} followed by n*d float32 values
+(unit-normalized, row-major), or {"error": ...}.
+"""
+import argparse, asyncio, json, os, time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SBERT_MODEL = "all-MiniLM-L6-v2"
+
+# =========================
+# Encoder processes (each loads the model once)
+# =========================
+_model = None
+
+def _init_encoder(model_name: str, threads: int):
+    global _model
+    try:
+        import torch
+        torch.set_num_threads(threads)  # procs × threads ≈ cores, instead of every process grabbing them all
+    except ImportError:
+        pass
+    from sentence_transformers import SentenceTransformer
+    _model = SentenceTransformer(model_name)
+
+def _encode(texts: list[str]) -> np.ndarray:
+    return np.asarray(_model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+# =========================
+# Micro-batching server
+# =========================
+class Batcher:
+    def __init__(self, pool, procs: int, window: float, max_batch: int):
+        self.pool, self.procs, self.window, self.max_batch = pool, procs, window, max_batch
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.dim = None
+        self.batches = self.texts = 0
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, fut))
+        return await fut
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            size, deadline = len(pending[0][0]), loop.time() + self.window
+            while size < self.max_batch and (left := deadline - loop.time()) > 0:
+                try: pending.append(await asyncio.wait_for(self.queue.get(), left))
+                except asyncio.TimeoutError: break
+                size += len(pending[-1][0])
+            uniq = list(dict.fromkeys(t for texts, _ in pending for t in texts))
+            try:
+                step = -(-len(uniq) // self.procs)  # one chunk per encoder process
+                parts = await asyncio.gather(*(loop.run_in_executor(self.pool, _encode, uniq[i:i+step])
+                                               for i in range(0, len(uniq), step)))
+                vecs = np.concatenate(parts) if parts else np.zeros((0, self.dim or 0), dtype=np.float32)
+                self.dim = vecs.shape[1] if len(vecs) else self.dim
+                row = {t: i for i, t in enumerate(uniq)}
+                for texts, fut in pending:
+                    if not fut.done(): fut.set_result(vecs[[row[t] for t in texts]])
+                self.batches += 1; self.texts += len(uniq)
+            except Exception as e:
+                for _, fut in pending:
+                    if not fut.done(): fut.set_exception(e)
+
+async def handle(batcher: Batcher, model_name: str, reader, writer):
+    try:
+        req = json.loads(await reader.readline() or b"{}")
+        if req.get("op") == "ping":
+            writer.write(json.dumps({"ok": True, "model": model_name, "batches": batcher.batches,
+                                     "texts": batcher.texts}).encode() + b"\n")
+        else:
+            texts = [str(t) for t in req.get("texts", [])]
+            vecs = await batcher.embed(texts) if texts else np.zeros((0, batcher.dim or 0), dtype=np.float32)
+            header = {"n": len(texts), "dim": int(vecs.shape[1]) if vecs.ndim == 2 else 0, "model": model_name}
+            writer.write(json.dumps(header).encode() + b"\n" + np.ascontiguousarray(vecs, dtype=np.float32).tobytes())
+        await writer.drain()
+    except Exception as e:
+        writer.write(json.dumps({"error": str(e)}).encode() + b"\n")
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def serve(path: str, model_name: str, procs: int, window: float, max_batch: int):
+    threads = max(1, (os.cpu_count() or 1) // procs)
+    pool = ProcessPoolExecutor(max_workers=procs, initializer=_init_encoder, initargs=(model_name, threads))
+    t = time.perf_counter()
+    await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(pool, _encode, ["warm up"]) for _ in range(procs)))
+    print(f"[embed-worker] {procs} × {model_name} ready in {time.perf_counter() - t:.1f}s on {path}")
+    batcher = Batcher(pool, procs, window, max_batch)
+    if os.path.exists(path): os.unlink(path)  # stale socket from a previous run
+    server = await asyncio.start_unix_server(lambda r, w: handle(batcher, model_name, r, w), path=path)
+    async with server:
+        await asyncio.gather(server.serve_forever(), batcher.run())
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--socket", default="/tmp/newsagent-embed.sock")
+    ap.add_argument("--model", default=SBERT_MODEL)
+    ap.add_argument("--procs", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    ap.add_argument("--window-ms", type=float, default=5.0, help="how long to gather requests into one batch")
+    ap.add_argument("--max-batch", type=int, default=512, help="texts per batch before it is sent early")
+    a = ap.parse_args()
+    asyncio.run(serve(a.socket, a.model, a.procs, a.window_ms / 1000, a.max_batch))
@@ -0,0 +1,20 @@
+"""app.py imported headlessly (no `streamlit run`, so widgets are no-ops) for offline scripts:
+
+    from headless import app
+
+Unless already set in the environment: a throwaway CACHE_DIR, no ingester thread, and unroutable NewsAPI /
+OpenAI bases so any stray upstream call fails fast. The "no ScriptRunContext" warnings of running outside a
+script run are silenced.
+"""
+import logging, os, sys, tempfile
+
+_script = os.path.splitext(os.path.basename(sys.argv[0] or "headless"))[0]
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix=f"newsagent-{_script}-"))
+os.environ.setdefault("INGEST_DAEMON", "0")
+os.environ.setdefault("NEWSAPI_BASE", "http://127.0.0.1:9/v2")
+os.environ.setdefault("OPENAI_BASE", "http://127.0.0.1:9/v1")
+logging.disable(logging.WARNING)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import app  # noqa: E402
+
+__all__ = ["app"]
@@ -0,0 +1,233 @@
+"""Local stand-in for NewsAPI, OpenAI and the RSS feeds, so app.py runs offline at any load.
+
+    python standin.py --port 8765 --latency-ms 80 --llm-latency-ms 400 --error-rate 0.02
+
+then point the app at it (secrets.toml or environment):
+
+    NEWSAPI_BASE = "http://127.0.0.1:8765/v2"
+    OPENAI_BASE  = "http://127.0.0.1:8765/v1"
+    RSS_BASE     = "http://127.0.0.1:8765"
+
+Answers are deterministic for a given request (and --seed): articles mention the query's terms and include
+near-duplicates across outlets, embeddings are bag-of-words so similar texts are similar, chat replies honour
+JSON mode and streaming, and feeds support ETag / 304. Latency, jitter, 5xx errors and NewsAPI's daily 429
+can be injected.
+"""
+import argparse, hashlib, json, random, re, threading, time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+WORDS = ("market rally policy budget rupee startup funding court ruling monsoon crop exports chip factory bank "
+         "merger election vaccine hospital climate summit ceasefire oil prices jobs inflation tariff satellite "
+         "launch reform growth outlook deal probe strike metro airport battery solar rail").split()
+SOURCES = ["Reuters", "The Hindu", "Mint", "BBC News", "Bloomberg", "Economic Times", "Indian Express",
+           "Hindustan Times", "Associated Press", "Al Jazeera English", "Business Standard", "NDTV"]
+CATEGORY_TERMS = {"technology": ["ai", "chip", "startup"], "business": ["bank", "market", "rbi"],
+                  "health": ["hospital", "vaccine", "wellness"], "general": ["policy", "election"]}
+
+def _rng(*parts) -> random.Random:
+    return random.Random(hashlib.blake2b(json.dumps(parts, sort_keys=True).encode(), digest_size=8).digest())
+
+# =========================
+# Fake upstream payloads
+# =========================
+def articles(key: str, terms: list[str], n: int, now: datetime) -> list[dict]:
+    rnd, out = _rng(key), []
+    slug = hashlib.blake2b(key.encode(), digest_size=4).hexdigest()
+    for i in range(n):
+        if i % 7 == 6 and out:  # the same story from another outlet
+            dup = dict(out[-1])
+            dup["source"] = {"id": None, "name": rnd.choice(SOURCES)}
+            dup["url"] = f"https://{dup['source']['name'].lower().replace(' ', '')}.example/{slug}/{i}"
+            out.append(dup)
+            continue
+        words = [rnd.choice(WORDS) for _ in range(rnd.randint(6, 10))]
+        if terms: words.insert(rnd.randrange(len(words)), rnd.choice(terms))
+        title = " ".join(words).capitalize()
+        src = rnd.choice(SOURCES)
+        out.append({
+            "source": {"id": None, "name": src}, "author": None, "title": title,
+            "description": " ".join(rnd.choice(WORDS) for _ in range(30)) + ".",
+            "url": f"https://{src.lower().replace(' ', '')}.example/{slug}/{i}",
+            "urlToImage": None,
+            "publishedAt": (now - timedelta(minutes=rnd.randint(5, 60 * 60))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "content": None,
+        })
+    return out
+
+def query_terms(q: str) -> list[str]:
+    return [t.strip().strip('"').lower() for t in re.split(r"\bOR\b|\bAND\b|[()]", q) if t.strip().strip('"')]
+
+@lru_cache(maxsize=50000)
+def _word_vec(word: str, dim: int) -> np.ndarray:
+    return np.random.default_rng(int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "big")) \
+        .standard_normal(dim).astype(np.float32)
+
+def embedding(text: str, dim: int) -> list[float]:
+    words = re.findall(r"[a-z0-9]+", text.lower()) or ["empty"]
+    v = np.sum([_word_vec(w, dim) for w in words], axis=0)
+    return (v / (np.linalg.norm(v) or 1)).tolist()
+
+def chat_reply(payload: dict) -> str:
+    msgs = payload.get("messages") or [{}]
+    rnd = _rng(msgs, payload.get("model"))
+    user = msgs[-1].get("content", "")
+    sentence = lambda k: " ".join(rnd.choice(WORDS) for _ in range(k)).capitalize() + "."
+    try: req = json.loads(user)
+    except (ValueError, TypeError): req = {}
+    req = req if isinstance(req, dict) else {}
+    if (payload.get("response_format") or {}).get("type") == "json_object":
+        ids = [a.get("id") for a in req.get("articles", []) if isinstance(a, dict)]
+        return json.dumps({i: f"{sentence(12)} {sentence(10)}" for i in ids} if ids else {"text": sentence(20)})
+    if isinstance(req.get("STRUCTURE"), dict):  # expand: one paragraph per requested section
+        return "\n\n".join(f"**{h}**\n{sentence(22)} A → B → C. {sentence(14)}" for h in req["STRUCTURE"])
+    return f"{sentence(14)} {sentence(12)}"
+
+def rss(feed: str, now: datetime) -> str:
+    rnd = _rng(feed)
+    items = []
+    for i in range(20):
+        title = " ".join(rnd.choice(WORDS) for _ in range(8)).capitalize()
+        when = format_datetime(now - timedelta(minutes=17 * i))
+        items.append(f"<item><title>{title}</title><link>{feed.rstrip('/')}/story/{i}</link><guid>{feed}#{i}</guid>"
+                     f"<pubDate>{when}</pubDate><description>{' '.join(rnd.choice(WORDS) for _ in range(30))}"
+                     f"</description></item>")
+    name = urlparse(feed).netloc or "Feed"
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>{name}</title>{"".join(items)}</channel></rss>'
+
+# =========================
+# Server
+# =========================
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    opts = None
+    now = None
+    newsapi_used = 0
+    lock = threading.Lock()
+    stats = {}
+
+    def log_message(self, fmt, *args):
+        if self.opts.verbose: super().log_message(fmt, *args)
+
+    def _send(self, status: int, body: bytes, ctype="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, obj, status=200, headers=None):
+        self._send(status, json.dumps(obj).encode(), headers=headers)
+
+    def _delay(self, llm=False):
+        base = self.opts.llm_latency_ms if llm else self.opts.latency_ms
+        time.sleep(max(0.0, base + random.uniform(-self.opts.jitter_ms, self.opts.jitter_ms)) / 1000)
+
+    def _fail(self) -> bool:
+        if self.opts.error_rate and random.random() < self.opts.error_rate:
+            self._json({"status": "error", "message": "injected failure"}, status=500)
+            return True
+        return False
+
+    def _count(self, name):
+        with self.lock: StandIn.stats[name] = StandIn.stats.get(name, 0) + 1
+
+    def do_GET(self):
+        u = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(u.query).items()}
+        q.pop("apiKey", None)
+        if u.path == "/stats":
+            return self._json({"requests": StandIn.stats, "newsapi_used": StandIn.newsapi_used})
+        if u.path in ("/v2/top-headlines", "/v2/everything"):
+            self._count(u.path)
+            with self.lock:
+                StandIn.newsapi_used += 1
+                limited = self.opts.newsapi_limit and StandIn.newsapi_used > self.opts.newsapi_limit
+            self._delay()
+            if limited:
+                return self._json({"status": "error", "code": "rateLimited", "message": "too many requests"},
+                                  status=429, headers={"Retry-After": "60"})
+            if self._fail(): return
+            terms = query_terms(q.get("q", "")) or CATEGORY_TERMS.get(q.get("category", "general"), [])
+            n = min(int(q.get("pageSize", 20)), 100)
+            arts = articles(json.dumps([u.path, q, self.opts.seed], sort_keys=True), terms, n, self.now)
+            return self._json({"status": "ok", "totalResults": len(arts), "articles": arts})
+        if u.path == "/rss":
+            self._count("/rss")
+            self._delay()
+            if self._fail(): return
+            body = rss(q.get("u", ""), self.now).encode()
+            etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag: return self._send(304, b"", headers={"ETag": etag})
+            return self._send(200, body, ctype="application/rss+xml", headers={"ETag": etag})
+        self._json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        u = urlparse(self.path)
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if u.path == "/v1/embeddings":
+            self._count(u.path)
+            self._delay()
+            if self._fail(): return
+            texts = payload.get("input") or []
+            texts = [texts] if isinstance(texts, str) else texts
+            data = [{"object": "embedding", "index": i, "embedding": embedding(t, self.opts.dim)} for i, t in enumerate(texts)]
+            return self._json({"object": "list", "data": data, "model": payload.get("model"),
+                               "usage": {"prompt_tokens": sum(len(t.split()) for t in texts)}})
+        if u.path == "/v1/chat/completions":
+            self._count(u.path)
+            self._delay(llm=True)
+            if self._fail(): return
+            text = chat_reply(payload)
+            usage = {"prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in payload.get("messages", [])),
+                     "completion_tokens": len(text.split())}
+            if not payload.get("stream"):
+                return self._json({"id": "standin", "object": "chat.completion", "model": payload.get("model"),
+                                   "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                                "finish_reason": "stop"}], "usage": usage})
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            def chunk(data: str):
+                raw = f"data: {data}\n\n".encode()
+                self.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+                self.wfile.flush()
+            for piece in re.findall(r"\S+\s*", text):
+                chunk(json.dumps({"choices": [{"index": 0, "delta": {"content": piece}}]}))
+                time.sleep(self.opts.token_ms / 1000)
+            chunk("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        self._json({"error": "not found"}, status=404)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0, help="NewsAPI / RSS / embeddings response time")
+    ap.add_argument("--llm-latency-ms", type=float, default=0, help="chat time to first byte")
+    ap.add_argument("--token-ms", type=float, default=0, help="delay between streamed chat deltas")
+    ap.add_argument("--jitter-ms", type=float, default=0)
+    ap.add_argument("--error-rate", type=float, default=0, help="share of requests answered with a 500")
+    ap.add_argument("--newsapi-limit", type=int, default=0, help="NewsAPI requests before every call is a 429")
+    ap.add_argument("--dim", type=int, default=1536, help="embedding size")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--verbose", action="store_true")
+    StandIn.opts = opts = ap.parse_args()
+    random.seed(opts.seed)
+    StandIn.now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)  # fixed for the run
+    server = ThreadingHTTPServer((opts.host, opts.port), StandIn)
+    server.daemon_threads = True
+    print(f"[standin] http://{opts.host}:{opts.port} (NewsAPI /v2, OpenAI /v1, feeds /rss)")
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+    main()